@@ -1,15 +1,28 @@
 import os
+import sys
+from functools import partial
 import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
 from paddlex import create_model
-import json
-from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from PyPDF2 import PdfReader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_utils.bbox import draw_boxes
+from pdf_utils.coords import PageTransform, transform_boxes
+from pdf_utils.columnar import COLUMNAR_EXT, load_pages
+from pdf_utils.json_loader import load_json
+from pdf_utils.pdf_meta import get_document_meta
+from pdf_utils.pipeline import run_pipeline
+from pdf_utils.render_cache import default_cache
+from pdf_utils.text_layer import TextLayerWriter, layout_lines, synthesize_shard
+from pdf_utils.trace import span, traced
 
 
 #注册本地字体：
+@traced("register_font")
 def register_custom_font(ttf_file_path):
     """
     注册自定义字体，使用 TTF 文件名（不含扩展名）作为字体名称
@@ -29,19 +42,15 @@ def register_custom_font(ttf_file_path):
         return None
 
 #获取pdf大小：
-def get_pdf_page_size(pdf_path):
+def get_pdf_page_size(pdf_path, page_num=0):
     """
-    获取 PDF 页面尺寸（宽度和高度）
+    获取 PDF 页面尺寸（宽度和高度），逐页元数据只在第一次调用时解析并缓存
     :param pdf_path: 原始 PDF 文件路径
+    :param page_num: 页码，超出页数时使用最后一页
     :return: 页面尺寸 (width, height)
     """
     try:
-        reader = PdfReader(pdf_path)
-        page = reader.pages[0]  # 获取第一页作为参考
-        width = float(page.mediabox.upper_right[0])  # 宽度
-        height = float(page.mediabox.upper_right[1])  # 高度
-        print(f"Original PDF page size: {width} x {height}")
-        return width, height
+        return get_document_meta(pdf_path).page_size(page_num)
     except Exception as e:
         print(f"Error reading PDF dimensions: {e}")
         return letter  # 如果无法获取尺寸，回退到默认 Letter 尺寸
@@ -60,64 +69,65 @@ def create_pdf(json_data, output_path, original_pdf_path, font_name="Helvetica",
     :param align: 对齐方式 ("left", "center", "right")
     :param line_spacing_multiplier: 行间距倍数，默认为 1.5
     """
-    # 获取原始 PDF 页面尺寸
-    width, height = get_pdf_page_size(original_pdf_path)
-
-    c = canvas.Canvas(output_path, pagesize=(width, height))
-
     # 计算行间距
     line_spacing = font_size * line_spacing_multiplier
 
-    for page in json_data['pages']:
-        texts = page['text']
-        polys = page.get('poly', [])
-
-        if polys:
-            current_y = None  # 用于跟踪当前行的 y 坐标
-            for text, poly_points in zip(texts, polys):
-                # 提取 X 和 Y 坐标
-                x_coords = [point["X"] * width for point in poly_points]  # 映射到实际宽度
-                y_coords = [point["Y"] * height for point in poly_points]  # 映射到实际高度
-
-                # 确定矩形框的边界
-                min_x = min(x_coords)  # 左边界的 x 坐标
-                max_x = max(x_coords)  # 右边界的 x 坐标
-                min_y = min(y_coords)  # 下边界的 y 坐标
-                max_y = max(y_coords)  # 上边界的 y 坐标
-
-                # 转换 Y 坐标（ReportLab 使用左下角为原点）
-                y_top = height - min_y  # 矩形框顶部的 y 坐标
-
-                # 如果是新段落，更新当前行的 y 坐标
-                if current_y is None:
-                    current_y = y_top
-                else:
-                    current_y -= line_spacing  # 应用行间距
-
-                # 设置字体和大小
-                c.setFont(font_name, font_size)
-
-                # 设置字体颜色
-                c.setFillColorRGB(*font_color)  # 使用 RGB 颜色
-
-                # 根据对齐方式绘制文本
-                if align == "center":
-                    # 居中对齐
-                    text_width = c.stringWidth(text, font_name, font_size)
-                    text_x = min_x + (max_x - min_x - text_width) / 2
-                    c.drawCentredString(text_x, current_y, text)
-                elif align == "right":
-                    # 右对齐
-                    text_width = c.stringWidth(text, font_name, font_size)
-                    text_x = max_x - text_width
-                    c.drawRightString(text_x, current_y, text)
-                else:
-                    # 默认左对齐
-                    c.drawString(min_x, current_y, text)
-
-        c.showPage()  # 完成当前页
-
-    c.save()  # 保存 PDF 文件
+    # 每页一个文本对象，字体与颜色每页只设置一次，居中/右对齐的字形宽度走缓存
+    with span("create_pdf", pdf=original_pdf_path, pages=len(json_data['pages'])), \
+            TextLayerWriter(output_path, get_pdf_page_size(original_pdf_path), font_name, font_size, font_color) as writer:
+        for page_num, page in enumerate(json_data['pages']):
+            with span("create_pdf.page", page=page_num):
+                # 每页使用原始 PDF 对应页面的尺寸（混合尺寸的文档逐页不同）
+                width, height = get_pdf_page_size(original_pdf_path, page_num)
+                polys = page.get('poly', [])
+                lines = layout_lines(page['text'], polys, width, height, font_name, font_size,
+                                     align=align, line_spacing=line_spacing) if polys else []
+                writer.add_page(lines, pagesize=(width, height))  # 完成当前页
+
+
+def iter_shard_documents(json_folder, pdf_folder, output_folder):
+    """
+    惰性遍历 shard 中的文档，每次只读取一个结果文件；同名的列式 .npz 优先于 JSON（内存映射，无需解析）
+    :param json_folder: JSON / .npz 文件夹
+    :param pdf_folder: 原始 PDF 文件夹，与 JSON 同名
+    :param output_folder: 输出文件夹
+    :return: 依次产出 (json_data, output_path, original_pdf_path)
+    """
+    filenames = set(os.listdir(json_folder))
+    for filename in sorted(filenames):
+        stem, ext = os.path.splitext(filename)
+        if ext not in ('.json', COLUMNAR_EXT):
+            continue
+        if ext == '.json' and stem + COLUMNAR_EXT in filenames:
+            continue
+        original_pdf_path = os.path.join(pdf_folder, stem + '.pdf')
+        if not os.path.exists(original_pdf_path):
+            print(f"Skip {filename}: original PDF not found.")
+            continue
+        try:
+            json_data = load_pages(os.path.join(json_folder, filename))
+        except ValueError as e:
+            print(f"Skip {filename}: {e}")
+            continue
+        yield json_data, os.path.join(output_folder, stem + '.pdf'), original_pdf_path
+
+
+def create_pdfs_for_shard(json_folder, pdf_folder, output_folder, **kwargs):
+    """
+    为整个 shard 批量合成纯文本 PDF，逐个文档生成并写盘，内存占用与 shard 大小无关
+    :param kwargs: 透传给 create_pdf 的字体、对齐等参数
+    :return: 成功生成的文件数
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    documents = iter_shard_documents(json_folder, pdf_folder, output_folder)
+    count = 0
+    for output_path, error in synthesize_shard(documents, partial(create_pdf, **kwargs)):
+        if error is not None:
+            print(f"Error creating {output_path}: {error}")
+        else:
+            count += 1
+    print(f"Created {count} PDF(s) in {output_folder}")
+    return count
 
 
 # 读取json文件
@@ -130,12 +140,10 @@ def read_json_file(json_path):
     if not os.path.exists(json_path):
         raise FileNotFoundError(f"文件未找到: {json_path}")
 
-    with open(json_path, "r", encoding="utf-8") as file:
-        try:
-            data = json.load(file)
-            return data
-        except json.JSONDecodeError as e:
-            raise ValueError(f"JSON文件解析失败: {e}")
+    try:
+        return load_json(json_path)
+    except ValueError as e:
+        raise ValueError(f"JSON文件解析失败: {e}")
 
 
 # 根据表格预测结果的score值进行过滤：
@@ -148,12 +156,13 @@ def filter_by_score(data, threshold):
 
 
 # 在PDF页面上绘制表格框的预测结果
+@traced("draw_predictions")
 def draw_predictions_on_pdf(pdf_path, output_pdf_path, predictions):
     """
     在PDF文件上绘制预测结果。
     :param pdf_path: 输入的PDF文件路径
     :param output_pdf_path: 输出带注释的PDF文件路径
-    :param predictions: 每页的预测结果 (list of lists)
+    :param predictions: 每页的预测结果 (list of lists)，coordinate 为可见页面坐标（见 pdf_utils.coords）
     """
     doc = fitz.open(pdf_path)
 
@@ -162,20 +171,23 @@ def draw_predictions_on_pdf(pdf_path, output_pdf_path, predictions):
 
     for page_num, page_preds in enumerate(predictions):
         page = doc[page_num]
-
-        for pred in page_preds:
-            bbox = pred["coordinate"]
-            xmin, ymin, xmax, ymax = bbox
-
-            rect = fitz.Rect(xmin, ymin, xmax, ymax)
-            page.draw_rect(rect, color=(0, 0, 0), width=1.5)  # 绘制矩形框
-            # # 添加标签文本
-            # label = pred["label"]
-            # score = pred["score"]
-            # text = f"{label} ({score:.2f})"
-            # page.insert_text((xmin, ymin - 10), text, fontsize=8, color=(1, 0, 0))
-
-    doc.save(output_pdf_path)
+        if not page_preds:
+            continue
+
+        with span("draw_predictions.page", page=page_num, boxes=len(page_preds)):
+            # 可见页面坐标换算为该页的绘制坐标（未旋转页面上为恒等变换），整页的框一次绘制
+            coords = np.array([pred["coordinate"] for pred in page_preds], dtype=np.float64)
+            rects = transform_boxes(coords, page.derotation_matrix)
+            draw_boxes(page, rects, color=(0, 0, 0), labels=False, width=1.5)  # 绘制矩形框
+        # # 添加标签文本
+        # for pred, (xmin, ymin, xmax, ymax) in zip(page_preds, rects.tolist()):
+        #     label = pred["label"]
+        #     score = pred["score"]
+        #     text = f"{label} ({score:.2f})"
+        #     page.insert_text((xmin, ymin - 10), text, fontsize=8, color=(1, 0, 0))
+
+    with span("draw_predictions.save", output=output_pdf_path):
+        doc.save(output_pdf_path)
     doc.close()
 
 
@@ -210,9 +222,102 @@ def process_multiple_pages(pdf_path, output_pdf_path, json_folder, threshold):
     draw_predictions_on_pdf(pdf_path, output_pdf_path, all_predictions)
     print(f"带注释的 PDF 已保存到: {output_pdf_path}")
 
+# 渲染进程使用的渲染函数：按 zoom 倍数渲染页面，返回 BGR ndarray（与从 JPEG 文件读入时的通道顺序一致）
+def render_page_for_table(page, zoom=1):
+    with span("table.render", page=page.number, zoom=zoom):
+        rgb = default_cache().get_pixmap_array(page, fitz.Matrix(zoom, zoom))  # 将页面转换为图像（经过渲染缓存）
+        return np.ascontiguousarray(rgb[:, :, ::-1])
+
+
+# 将每页预测框的像素坐标换算为可见页面坐标（考虑渲染倍数、页面旋转和 cropbox），每页一次向量化计算
+def predictions_to_page_space(pdf_path, predictions, zoom=1):
+    """
+    :param pdf_path: 渲染时使用的PDF文件路径
+    :param predictions: 每页的预测框列表，coordinate 为渲染图上的像素坐标
+    :param zoom: 渲染倍数
+    :return: coordinate 换算为可见页面坐标后的预测框列表
+    """
+    mapped = []
+    # 使用缓存的逐页元数据，不再重新打开 PDF
+    for page, page_preds in zip(get_document_meta(pdf_path), predictions):
+        if not page_preds:
+            mapped.append([])
+            continue
+        transform = PageTransform(page, fitz.Matrix(zoom, zoom))
+        coords = transform.to_visible([pred["coordinate"] for pred in page_preds])
+        mapped.append([dict(pred, coordinate=coord) for pred, coord in zip(page_preds, coords.tolist())])
+    return mapped
+
+
+class TableResultWriter:
+    """
+    写出线程中收集每页的预测框；debug 时另外保存每页的图像、可视化结果和 JSON 结果，文件名与逐页处理时一致
+    """
+
+    def __init__(self, output_dir, debug=False):
+        self.output_dir = output_dir
+        self.debug = debug
+        self.predictions = None
+
+    def write_page(self, pdf_path, page_num, image, res):
+        if not self.debug:
+            return
+        with span("table.write_page", page=page_num):
+            self._save_debug_files(page_num, image, res)
+
+    def _save_debug_files(self, page_num, image, res):
+        image_path = f"{self.output_dir}page_{page_num + 1}.jpg"
+        Image.fromarray(image[:, :, ::-1]).save(image_path)  # 保存图像到文件
+        res.print(json_format=False)  # 打印结果
+        res.save_to_img(f"{self.output_dir}res_page_{page_num + 1}.jpg")  # 保存可视化结果
+        res.save_to_json(f"{self.output_dir}res_page_{page_num + 1}.json")  # 保存 JSON 结果
+
+    def finish_document(self, pdf_path, page_results):
+        self.predictions = [res['boxes'] for res in page_results]
+        print(f"{pdf_path}: {len(page_results)} 页表格检测完成")
+
+
+# 以流水线方式检测表格：渲染进程、模型推理、结果收集三个阶段并行，页面图像直接以 ndarray 传给模型
+def detect_tables(pdf_path, model, output_dir, zoom=1, batch_size=4, debug=False, render_workers=2, queue_size=8):
+    """
+    :param pdf_path: 输入的PDF文件路径
+    :param model: paddlex 表格单元格检测模型
+    :param output_dir: 保存中间结果的文件夹（仅 debug 时写入）
+    :param zoom: 渲染倍数，提高分辨率可提升检测精度，返回的坐标已换算回页面坐标
+    :param batch_size: 每次 predict 的页数
+    :param debug: 是否保存每页的图像、可视化结果和 JSON 结果
+    :param render_workers: 渲染进程数
+    :param queue_size: 渲染队列和写出队列的容量（页数），限制内存占用
+    :return: 每页的预测框列表 (list of lists)，coordinate 为可见页面坐标
+    """
+    def predict(images):
+        # 对一批图像进行预测，结果与输入顺序一致
+        with span("table.predict", pages=len(images)):
+            return list(model.predict(images, threshold=0.3, batch_size=len(images)))
+
+    with span("detect_tables", pdf=pdf_path, zoom=zoom):
+        writer = TableResultWriter(output_dir, debug)
+        run_pipeline([pdf_path], partial(render_page_for_table, zoom=zoom), predict, writer,
+                     render_workers=render_workers, queue_size=queue_size, batch_size=batch_size)
+        return predictions_to_page_space(pdf_path, writer.predictions, zoom)
+
+
+# 按阈值过滤内存中的预测结果并绘制到 PDF 上
+def draw_table_predictions(pdf_path, output_pdf_path, predictions, threshold):
+    """
+    :param pdf_path: 输入的PDF文件路径
+    :param output_pdf_path: 输出带注释的PDF文件路径
+    :param predictions: 每页的预测框列表 (list of lists)
+    :param threshold: 过滤阈值
+    """
+    all_predictions = [filter_by_score(page_boxes, threshold) for page_boxes in predictions]
+    draw_predictions_on_pdf(pdf_path, output_pdf_path, all_predictions)
+    print(f"带注释的 PDF 已保存到: {output_pdf_path}")
+
+
 def main():
     original_pdf_path = "fjny0110.pdf"  # 替换为你的原始 PDF 文件路径
-    json_file_path = "fjny0110.json"  # 替换为你的 JSON 文件路径
+    json_file_path = "fjny0110.json"  # 替换为你的 JSON 文件路径（也可以是转换后的列式 .npz 文件）
     output_pdf_path = "output_text.pdf"
     ttf_file_path = "/System/Library/Fonts/Supplemental/AppleMyungjo.ttf"  # 替换为你的 TTF 文件路径（可选）
     font_size = 12  # 字体大小
@@ -221,12 +326,11 @@ def main():
     line_spacing_multiplier = 1  # 行间距倍数
     # 加载 JSON 数据
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = load_pages(json_file_path)
     except FileNotFoundError:
         print(f"Error: The file '{json_file_path}' was not found.")
         return
-    except json.JSONDecodeError:
+    except ValueError:
         print(f"Error: Failed to parse JSON data from '{json_file_path}'.")
         return
 
@@ -258,33 +362,19 @@ def main():
     output_dir = "./output/"#保存表格识别结果地址
     output_pdf_path2 = "output_text&table.pdf"  # 输出PDF路径
     threshold = 0.8  # 过滤阈值
+    render_zoom = 2  # 表格检测的渲染倍数
+    debug = False  # 是否保存每页的图像和预测结果等中间文件
     # 创建模型
     model = create_model(model_name="RT-DETR-L_wired_table_cell_det")
     # 确保输出目录存在
-    os.makedirs(output_dir, exist_ok=True)
-
-    # 打开 PDF 文件
-    doc = fitz.open(original_pdf_path)
-
-    # 遍历每一页，提取图像并进行预测
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)  # 加载页面
-        pix = page.get_pixmap()  # 将页面转换为图像
-        image_path = f"{output_dir}page_{page_num + 1}.jpg"
-        pix.save(image_path)  # 保存图像到文件
-
-        # 对图像进行预测
-        output = model.predict(image_path, threshold=0.3, batch_size=1)
+    if debug:
+        os.makedirs(output_dir, exist_ok=True)
 
-        # 处理预测结果
-        for res in output:
-            res.print(json_format=False)  # 打印结果
-            res.save_to_img(output_dir)  # 保存可视化结果
-            res.save_to_json(f"{output_dir}res_page_{page_num + 1}.json")  # 保存 JSON 结果
+    # 遍历每一页，提取图像并进行预测（渲染与推理重叠进行，预测结果保存在内存中）
+    predictions = detect_tables(original_pdf_path, model, output_dir, zoom=render_zoom, debug=debug)
 
     print("PDF页面处理完成！")
-    json_folder = output_dir
-    process_multiple_pages(pdf_path_draw, output_pdf_path2, json_folder, threshold)
+    draw_table_predictions(pdf_path_draw, output_pdf_path2, predictions, threshold)
 
 
 if __name__ == "__main__":
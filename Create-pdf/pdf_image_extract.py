@@ -1,25 +1,52 @@
+import argparse
 import json
 import fitz  # PyMuPDF
 from PIL import Image
-from io import BytesIO
-from transformers import Qwen2VLForConditionalGeneration, AutoProcessor
-from qwen_vl_utils import process_vision_info
-import torch
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_utils.pdf_images import ImageExtractor
+from pdf_utils.checkpoint import PageCheckpoint
+from pdf_utils.render_cache import default_cache, file_hash
+from pdf_utils.trace import span
+from pdf_utils.vlm import BACKENDS, create_backend
+
+DEFAULT_MODEL_PATH = "models/Qwen2-VL-7B-Instruct/models--Qwen--Qwen2-VL-7B-Instruct/snapshots/eed13092ef92e448dd6875b2a00151bd3f7db0ac"
+
+# 页面分析提示词
+PAGE_PROMPT = (
+    "Analyze this PDF page and extract all images with their details. "
+    "For each image, provide:\n"
+    "1. Its exact position on the page (coordinates and size)\n"
+    "2. Raw binary content\n"
+    "Format the response as a JSON object with 'images' array."
+)
+
+# 图片描述提示词（图片区域模式下只把嵌入图片本身交给模型）
+CROP_PROMPT = (
+    "Describe this image from a PDF document. "
+    "Format the response as a JSON object with a 'caption' field (one or two sentences) "
+    "and a 'type' field (photo, chart, diagram, logo, table, or other)."
+)
+
 
 class PDFImageAnalyzer:
-    def __init__(self, model_path="models/Qwen2-VL-7B-Instruct/models--Qwen--Qwen2-VL-7B-Instruct/snapshots/eed13092ef92e448dd6875b2a00151bd3f7db0ac"):
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, render_cache=None, backend="qwen", device="auto", batch_size=4):
         """
         初始化模型和处理器
         :param model_path: 本地模型路径
+        :param render_cache: 页面渲染缓存，None 时使用全局缓存
+        :param backend: 推理后端名称（见 pdf_utils.vlm.BACKENDS），或已创建的后端对象
+        :param device: 推理设备，"auto"、"cuda" 或 "cpu"
+        :param batch_size: 每次 generate 处理的页数
         """
-        self.model = Qwen2VLForConditionalGeneration.from_pretrained(
-              model_path,
-              torch_dtype=torch.bfloat16,
-              attn_implementation="flash_attention_2",
-              device_map="auto",
-        )
-        self.processor = AutoProcessor.from_pretrained(model_path)
+        self.render_cache = render_cache or default_cache()
+        if isinstance(backend, str):
+            backend = create_backend(backend, model_path=model_path, device=device)
+        self.backend = backend
+        self.batch_size = batch_size
+
     #将PDF页面渲染为高分辨率图片
     def render_page_as_image(self, page, zoom=2):
         """
@@ -28,10 +55,9 @@ class PDFImageAnalyzer:
         :param zoom: 缩放因子，提高分辨率
         :return: PIL Image对象
         """
-        mat = fitz.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=mat)
-        img_bytes = pix.tobytes("ppm")
-        return Image.open(BytesIO(img_bytes)).convert("RGB")
+        with span("vlm.render", page=page.number + 1, zoom=zoom):
+            mat = fitz.Matrix(zoom, zoom)
+            return Image.fromarray(self.render_cache.get_pixmap_array(page, matrix=mat))
 
     #使用大模型分析页面内容并提取图片信息
     def analyze_page(self, page_image, page_number):
@@ -41,88 +67,32 @@ class PDFImageAnalyzer:
         :param page_number: 页码
         :return: 包含图片信息的字典
         """
-        try:
-            # 准备页面图片
-            buffered = BytesIO()
-            page_image.save(buffered, format="PNG")
-            img_str = buffered.getvalue()
-            if not isinstance(img_str, bytes):
-                raise ValueError("Image data is not in bytes format")
-            # 构建提示词
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "image", "image": img_str},
-                        {"type": "text", "text": (
-                            "Analyze this PDF page and extract all images with their details. "
-                            "For each image, provide:\n"
-                            "1. Its exact position on the page (coordinates and size)\n"
-                            "2. Raw binary content\n"
-                            "Format the response as a JSON object with 'images' array."
-                        )},
-                    ],
-                }
-            ]
-
-            # 处理输入
-            text = self.processor.apply_chat_template(
-                messages, tokenize=False, add_generation_prompt=True
-            )
-            image_inputs, video_inputs = process_vision_info(messages)
-            # 确保 image_inputs 是字节类型
-            for img_input in image_inputs:
-                if not isinstance(img_input, bytes):
-                    raise ValueError("Image input is not in bytes format")
-
-            inputs = self.processor(
-                text=[text],
-                images=image_inputs,
-                videos=video_inputs,
-                padding=True,
-                return_tensors="pt",
-            )
-            inputs = inputs.to("cuda")
-
-            # 生成响应
-            generated_ids = self.model.generate(
-                **inputs,
-                max_new_tokens=1024,
-                do_sample=True,
-                temperature=0.7,
-                top_p=0.9
-            )
-
-            output_text = self.processor.batch_decode(
-                generated_ids,
-                skip_special_tokens=True,
-                clean_up_tokenization_spaces=False
-            )[0]
-
-            # 尝试解析JSON响应
-            try:
-                return {
-                    "page_number": page_number,
-                    "analysis": json.loads(output_text),
-                    "raw_response": output_text
-                }
-            except json.JSONDecodeError:
-                return {
-                    "page_number": page_number,
-                    "error": "Model did not return valid JSON",
-                    "raw_response": output_text
-                }
+        return self.analyze_pages([page_image], [page_number])[0]
 
+    #一次 generate 批量分析多页
+    def analyze_pages(self, page_images, page_numbers):
+        """
+        一次 generate 批量分析多页，PIL 图片直接送入处理器，每个样本单独解码和解析
+        :param page_images: PIL Image对象列表
+        :param page_numbers: 与图片对应的页码列表
+        :return: 每页一个结果字典，顺序与输入一致
+        """
+        try:
+            with span("vlm.analyze_pages", pages=page_numbers):
+                output_texts = self.backend.generate(page_images, PAGE_PROMPT)
         except Exception as e:
-            return {
-                "page_number": page_number,
-                "error": str(e)
-            }
+            return [{"page_number": page_number, "error": str(e)} for page_number in page_numbers]
+
+        return [parse_response(page_number, output_text)
+                for page_number, output_text in zip(page_numbers, output_texts)]
 
-    def process_pdf(self, pdf_path):
+    def process_pdf(self, pdf_path, mode="regions", image_dir=None):
         """
         处理PDF文件，分析每一页的内容
         :param pdf_path: PDF文件路径
+        :param mode: "regions" 先从PDF结构中提取嵌入图片，只把图片交给模型生成描述；
+                     "pages" 渲染整页，按 batch_size 页一批交给模型分析
+        :param image_dir: regions 模式下保存图片原始字节的文件夹，None 表示不保存
         :return: 包含分析结果的JSON
         """
         result = {
@@ -131,28 +101,188 @@ class PDFImageAnalyzer:
         }
 
         try:
-            doc = fitz.open(pdf_path)
-            result["page_count"] = len(doc)
-
-            for page_num, page in enumerate(doc, start=1):
-                # 渲染整个页面为图片
-                page_image = self.render_page_as_image(page)
-
-                # 使用大模型分析页面
-                page_result = self.analyze_page(page_image, page_num)
-                result["pages"].append(page_result)
+            with span("process_pdf", pdf=pdf_path, mode=mode), fitz.open(pdf_path) as doc:
+                result["page_count"] = len(doc)
+                result["pages"].extend(self.iter_page_results(doc, mode, image_dir))
 
         except Exception as e:
             result["error"] = str(e)
 
         return json.dumps(result, ensure_ascii=False, indent=4)
 
+    def process_pdf_resumable(self, pdf_path, checkpoint, mode="regions", image_dir=None):
+        """
+        处理PDF文件，每页完成后立即追加到 JSONL 并登记检查点；检查点中已完成的页面直接跳过
+        :param pdf_path: PDF文件路径
+        :param checkpoint: pdf_utils.checkpoint.PageCheckpoint
+        :return: 本次新处理的页数
+        """
+        pdf_hash = file_hash(pdf_path)
+        processed = 0
+        with span("process_pdf", pdf=pdf_path, mode=mode) as doc_span, fitz.open(pdf_path) as doc:
+            skip = {page_num for page_num in range(1, len(doc) + 1) if checkpoint.is_done(pdf_hash, page_num)}
+            if len(skip) == len(doc):
+                return 0
+            for page_result in self.iter_page_results(doc, mode, image_dir, skip):
+                record = {"pdf_file": pdf_path, "pdf_sha1": pdf_hash, "page_count": len(doc), **page_result}
+                checkpoint.write(pdf_hash, page_result["page_number"], record, done=not has_error(page_result))
+                processed += 1
+            doc_span.set(pages=processed, skipped=len(skip))
+        return processed
+
+    def iter_page_results(self, doc, mode="regions", image_dir=None, skip=()):
+        """
+        按页产出分析结果（批量推理，批次完成后依次产出其中的页面）
+        :param doc: 已打开的 PyMuPDF 文档
+        :param skip: 跳过的页码集合（从 1 开始）
+        """
+        page_numbers = [page_num for page_num in range(1, len(doc) + 1) if page_num not in skip]
+        if mode == "regions":
+            return self.iter_region_results(doc, page_numbers, image_dir)
+        return self.iter_full_page_results(doc, page_numbers)
+
+    def iter_full_page_results(self, doc, page_numbers):
+        """渲染整页，按 batch_size 页一批分析"""
+        for start in range(0, len(page_numbers), self.batch_size):
+            batch = page_numbers[start:start + self.batch_size]
+            # 渲染整个页面为图片
+            page_images = [self.render_page_as_image(doc[page_num - 1]) for page_num in batch]
+
+            # 使用大模型批量分析页面
+            yield from self.analyze_pages(page_images, batch)
+
+    def iter_region_results(self, doc, page_numbers, image_dir=None):
+        """
+        预提取每页的嵌入图片（xref、原始字节、可见页面坐标），没有图片的页面不调用模型；
+        每个不同的图片只送模型一次，描述结果写回它的所有放置位置。
+        待描述的图片攒够 batch_size 张后统一推理，并产出此前积压的页面
+        """
+        extractor = ImageExtractor(doc)
+        stem = os.path.splitext(os.path.basename(doc.name or "document"))[0]
+        if image_dir:
+            os.makedirs(image_dir, exist_ok=True)
+        captions = {}  # xref -> 描述结果
+        pending_pages, pending_xrefs = [], []
+
+        for page_num in page_numbers:
+            entries = []
+            with span("vlm.extract_images", page=page_num):
+                page_images = extractor.page_images(doc[page_num - 1])
+            for image in page_images:
+                entry = {key: image[key] for key in ("xref", "bbox", "width", "height", "ext")}
+                if image_dir:
+                    entry["file"] = os.path.join(image_dir, f"{stem}_xref{image['xref']}.{image['ext']}")
+                    if not os.path.exists(entry["file"]):
+                        with open(entry["file"], "wb") as f:
+                            f.write(image["image"])
+                if image["xref"] not in captions and image["xref"] not in pending_xrefs:
+                    pending_xrefs.append(image["xref"])
+                entries.append(entry)
+            pending_pages.append({"page_number": page_num, "images": entries})
+
+            if len(pending_xrefs) >= self.batch_size or not pending_xrefs:
+                yield from self._flush_regions(extractor, captions, pending_pages, pending_xrefs)
+        yield from self._flush_regions(extractor, captions, pending_pages, pending_xrefs)
+
+    def _flush_regions(self, extractor, captions, pending_pages, pending_xrefs):
+        """为积压的图片生成描述，写回积压页面的结果项后依次产出这些页面"""
+        for start in range(0, len(pending_xrefs), self.batch_size):
+            batch = pending_xrefs[start:start + self.batch_size]
+            with span("vlm.decode_images", images=len(batch)):
+                images = [extractor.to_pil(xref) for xref in batch]
+            captions.update(zip(batch, self.caption_images(images)))
+        for page_result in pending_pages:
+            for entry in page_result["images"]:
+                entry.update(captions[entry["xref"]])
+            yield page_result
+        pending_pages.clear()
+        pending_xrefs.clear()
+
+    def caption_images(self, images):
+        """
+        一次 generate 为一批图片生成描述
+        :param images: PIL Image对象列表
+        :return: 每张图片一个字典，包含 caption（解析后的JSON）或 error，以及 raw_response
+        """
+        try:
+            with span("vlm.caption_images", images=len(images)):
+                output_texts = self.backend.generate(images, CROP_PROMPT)
+        except Exception as e:
+            return [{"error": str(e)} for _ in images]
+        captions = []
+        for output_text in output_texts:
+            parsed = parse_response(None, output_text)
+            parsed.pop("page_number")
+            if "analysis" in parsed:
+                parsed["caption"] = parsed.pop("analysis")
+            captions.append(parsed)
+        return captions
+
+
+#判断页面结果中是否有推理错误
+def has_error(page_result):
+    """页面本身或其中任一图片的结果带有 error 时返回 True"""
+    return "error" in page_result or any("error" in entry for entry in page_result.get("images", ()))
+
+
+#解析模型的单条响应
+def parse_response(page_number, output_text):
+    """
+    尝试将模型输出解析为JSON
+    :param page_number: 页码
+    :param output_text: 模型输出文本
+    :return: 结果字典
+    """
+    try:
+        return {
+            "page_number": page_number,
+            "analysis": json.loads(output_text),
+            "raw_response": output_text
+        }
+    except json.JSONDecodeError:
+        return {
+            "page_number": page_number,
+            "error": "Model did not return valid JSON",
+            "raw_response": output_text
+        }
+
 
 if __name__ == "__main__":
-    analyzer = PDFImageAnalyzer()
-    pdf_path = "fjny0110.pdf"  # 替换为您的PDF文件路径
-    result_json = analyzer.process_pdf(pdf_path)
-    print(result_json)
-    # 可选：保存到文件
-    with open("analysis_result.json", "w", encoding="utf-8") as f:
-        f.write(result_json)
+    parser = argparse.ArgumentParser(description="使用视觉大模型分析PDF页面中的图片")
+    parser.add_argument("pdfs", nargs="*", default=["fjny0110.pdf"], help="PDF文件路径或PDF文件夹")
+    parser.add_argument("--output", default="analysis_result.json", help="结果保存路径（单个PDF，整体JSON）")
+    parser.add_argument("--jsonl", default=None,
+                        help="逐页追加写入的 JSONL 结果路径，附带检查点索引，重新运行时跳过已完成的页面")
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH, help="本地模型路径")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="qwen", help="推理后端，mock 为无 GPU 时的模拟后端")
+    parser.add_argument("--device", default="auto", help="推理设备：auto、cuda 或 cpu")
+    parser.add_argument("--batch-size", type=int, default=4, help="每次 generate 处理的页数或图片数")
+    parser.add_argument("--mode", choices=["regions", "pages"], default="regions",
+                        help="regions 只把嵌入图片交给模型，pages 分析整页")
+    parser.add_argument("--image-dir", default=None, help="regions 模式下保存图片原始字节的文件夹")
+    args = parser.parse_args()
+
+    pdf_paths = []
+    for path in args.pdfs:
+        if os.path.isdir(path):
+            pdf_paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.lower().endswith(".pdf"))
+        else:
+            pdf_paths.append(path)
+    if not args.jsonl and len(pdf_paths) != 1:
+        parser.error("处理多个PDF时请使用 --jsonl")
+
+    analyzer = PDFImageAnalyzer(args.model_path, backend=args.backend, device=args.device, batch_size=args.batch_size)
+    if args.jsonl:
+        with PageCheckpoint(args.jsonl) as checkpoint:
+            for pdf_path in pdf_paths:
+                try:
+                    processed = analyzer.process_pdf_resumable(pdf_path, checkpoint, mode=args.mode, image_dir=args.image_dir)
+                    print(f"{pdf_path}: {processed} page(s) processed")
+                except Exception as e:
+                    print(f"{pdf_path}: error {e}")
+    else:
+        result_json = analyzer.process_pdf(pdf_paths[0], mode=args.mode, image_dir=args.image_dir)
+        print(result_json)
+        # 可选：保存到文件
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(result_json)
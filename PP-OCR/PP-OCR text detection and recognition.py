@@ -1,77 +1,191 @@
-from paddleocr import PaddleOCR, draw_ocr
+"""
+PP-OCR 批量文本检测与识别：
+每页只渲染一次，渲染结果同时用于 OCR 和可视化；多个 PDF 的页面按批送入检测和识别，
+模型常驻内存；每个文档处理完成后立即写出对应的 pages_dict JSON。
+默认先读取 PDF 原生文本层，文本层可靠的页面不做 OCR（只对其中的图片区域做 OCR），
+扫描页和纯图片页整页 OCR；--ocr-only 关闭该行为。
+与原来一样默认为每页保存 <文件名>_result_page_N.jpg 可视化图片；批量处理时可用 --no-visualize 关闭，
+此时文本层可靠的页面完全不需要渲染。
+
+用法示例：
+    python "PP-OCR text detection and recognition.py" print_text.pdf
+    python "PP-OCR text detection and recognition.py" docs/*.pdf --output-dir ocr_result --batch-size 16 --no-visualize
+    python "PP-OCR text detection and recognition.py" long.pdf --render-workers 4 --queue-size 16
+    python "PP-OCR text detection and recognition.py" scanned.pdf --ocr-only
+"""
+import argparse
 import json
+import os
+import sys
+from functools import partial
+
+import fitz  # PyMuPDF
+from PIL import Image
+from paddleocr import draw_ocr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_utils.ocr import BatchOCR, HybridOCR, lines_to_page_dict, plan_page, render_page
+from pdf_utils.pipeline import run_pipeline
+
 # 设置需要识别的PDF文件路径和页面编号
-PAGE_NUM = 0  # 将识别页码前置作为全局，防止后续打开pdf的参数和前文识别参数不一致
-pdf_path = 'print_text.pdf'
-ocr = PaddleOCR(use_angle_cls=True,page_num=PAGE_NUM)  # 需要运行一次以下载并加载模型到内存中
-# 如果需要使用GPU，请取消以下行的注释，并注释上一行
-# ocr = PaddleOCR(use_angle_cls=True, lang="ch", page_num=PAGE_NUM, use_gpu=0)
-result = ocr.ocr(pdf_path, cls=True)
+PAGE_NUM = 0  # 将识别页码前置作为全局，防止后续打开pdf的参数和前文识别参数不一致（0 表示识别全部页面）
 
-# 保存识别结果：
-result2 = []
-for idx, res_per_page in enumerate(result):  # 使用enumerate来获取当前是第几页
-    if res_per_page is None:  # 如果该页没有识别出内容，则跳过
-        print(f"[DEBUG] Empty page {idx + 1} detected, skip it.")
-        continue
-    for line in res_per_page:
-        # 在此处为每一行添加页码信息
-        line_with_page_info = (line[0], line[1], idx + 1)  # 假设line是一个元组，这里我们添加了第三个元素，即页码
-        print(line_with_page_info)
-        result2.append(line_with_page_info)
 
-idx = 1
-pages_dict = {'pages': []}  # 初始化存储每页信息的结构
+def iter_pages(pdf_paths, page_num=PAGE_NUM, prepare=None):
+    """
+    依次渲染所有 PDF 的页面，每页只渲染一次
+    :param prepare: 页面预处理函数 page -> 推理输入，默认渲染为 BGR ndarray
+    :return: 生成器，产出 (pdf路径, 页码, 该文档要识别的页数, 推理输入)
+    """
+    prepare = prepare or render_for_ocr
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as pdf:
+            # 使用 pdf.page_count 获取 PDF 总页数
+            page_count = pdf.page_count if page_num == 0 else min(page_num, pdf.page_count)
+            for pg in range(page_count):
+                yield pdf_path, pg, page_count, prepare(pdf[pg])
 
-for item in result2:
-    current_idx = item[2]
 
-    # 检查是否已经存在current_idx对应的页面
-    if current_idx > len(pages_dict['pages']):
-        # 如果没有，则添加一个新的页面字典
-        pages_dict['pages'].append({'text': [],'poly': [], 'score': []})
+def render_for_ocr(page):
+    """渲染进程使用的渲染函数，只返回 BGR 图片"""
+    image, _ = render_page(page)
+    return image
 
-    # 确保current_idx不超过现有范围
-    if current_idx <= len(pages_dict['pages']):
-        pages_dict['pages'][current_idx - 1]['text'].append(item[1][0])
-        pages_dict['pages'][current_idx - 1]['poly'].append(item[0])
-        pages_dict['pages'][current_idx - 1]['score'].append(item[1][1])
 
-# 将pages_dict保存为json文件
-with open('pages_dict.json', 'w', encoding='utf-8') as f:
-    json.dump(pages_dict, f, ensure_ascii=False, indent=4)
+class OCRResultWriter:
+    """
+    保存识别结果：每页的可视化图片（开启时）在该页完成后立即保存，pages_dict JSON 在文档完成后保存
+    """
 
-print("pages_dict已保存为pages_dict.json")
+    def __init__(self, output_dir, visualize=True, font_path='simfang.ttf'):
+        self.output_dir = output_dir
+        self.visualize = visualize
+        self.font_path = font_path
 
+    def write_page(self, pdf_path, idx, image, res):
+        # 可视化检测结果：
+        if not self.visualize or res is None:
+            return
+        image = getattr(image, 'image', image)  # 混合模式下为 PagePlan
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+        boxes = [line[0] for line in res]
+        txts = [line[1][0] for line in res]
+        scores = [line[1][1] for line in res]
+        im_show = draw_ocr(image, boxes, txts, scores, font_path=self.font_path)
+        im_show = Image.fromarray(im_show)
+        im_show.save(os.path.join(self.output_dir, f"{stem}_result_page_{idx}.jpg"))
 
+    def finish_document(self, pdf_path, page_results):
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+        pages_dict = {'pages': []}  # 初始化存储每页信息的结构，每页一项，空白页为空列表
+        for idx, lines in enumerate(page_results):
+            if lines is None:  # 如果该页没有识别出内容，则保留空页
+                print(f"[DEBUG] Empty page {idx + 1} detected in {pdf_path}.")
+            pages_dict['pages'].append(lines_to_page_dict(lines))
 
+        # 将pages_dict保存为json文件
+        json_path = os.path.join(self.output_dir, f"{stem}_pages_dict.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(pages_dict, f, ensure_ascii=False, indent=4)
+        print(f"pages_dict已保存为{json_path}")
 
-# 可视化检测结果：
-import fitz
-from PIL import Image
-import cv2
-import numpy as np
-imgs = []
-with fitz.open(pdf_path) as pdf:
-    # 使用 pdf.page_count 获取 PDF 总页数
-    for pg in range(0, pdf.page_count):
-        page = pdf[pg]
-        mat = fitz.Matrix(2, 2)
-        pm = page.get_pixmap(matrix=mat, alpha=False)
-        if pm.width > 2000 or pm.height > 2000:
-            pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
-        img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
-        img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-        imgs.append(img)
-
-for idx in range(len(result)):
-    res = result[idx]
-    if res == None:
-        continue
-    image = imgs[idx]
-    boxes = [line[0] for line in res]
-    txts = [line[1][0] for line in res]
-    scores = [line[1][1] for line in res]
-    im_show = draw_ocr(image, boxes, txts, scores, font_path='simfang.ttf')
-    im_show = Image.fromarray(im_show)
-    im_show.save('result_page_{}.jpg'.format(idx))
\ No newline at end of file
+
+def prepare_functions(engine, native_text=True, visualize=True):
+    """
+    选择页面预处理函数和推理函数
+    :param native_text: 是否优先使用原生文本层
+    :return: (prepare, infer)，prepare 为模块级函数或其 partial，可传给渲染进程
+    """
+    if not native_text:
+        return render_for_ocr, engine.ocr_pages
+    return partial(plan_page, render_always=visualize), HybridOCR(engine).ocr_pages
+
+
+def load_engine():
+    engine = BatchOCR(use_angle_cls=True)  # 需要运行一次以下载并加载模型到内存中
+    # 如果需要使用GPU，请改为 BatchOCR(use_angle_cls=True, lang="ch", use_gpu=True)
+    return engine
+
+
+def run_ocr(pdf_paths, output_dir='.', batch_size=8, page_num=PAGE_NUM, visualize=True,
+            font_path='simfang.ttf', engine=None, native_text=True):
+    """
+    对多个 PDF 做批量 OCR，页面跨文档按 batch_size 分批，每个文档完成后立即保存结果
+    :param pdf_paths: PDF 文件路径列表
+    :param output_dir: 输出文件夹
+    :param batch_size: 每批送入检测和识别的页数
+    :param page_num: 每个文档识别的页数，0 表示全部
+    :param visualize: 是否保存可视化图片
+    :param font_path: 可视化使用的字体
+    :param engine: 已加载的 BatchOCR，None 时新建
+    :param native_text: 是否优先使用原生文本层，只对扫描页和图片区域做 OCR
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    engine = engine or load_engine()
+    prepare, infer = prepare_functions(engine, native_text, visualize)
+    writer = OCRResultWriter(output_dir, visualize, font_path)
+    documents = {}  # pdf路径 -> {页码: 识别结果}
+
+    def flush(batch):
+        results = infer([image for _, _, _, image in batch])
+        for (pdf_path, pg, page_count, image), lines in zip(batch, results):
+            writer.write_page(pdf_path, pg, image, lines)
+            document = documents.setdefault(pdf_path, {})
+            document[pg] = lines
+            if len(document) == page_count:
+                writer.finish_document(pdf_path, [document[i] for i in range(page_count)])
+                del documents[pdf_path]
+
+    batch = []
+    for item in iter_pages(pdf_paths, page_num, prepare):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+def run_ocr_pipelined(pdf_paths, output_dir='.', batch_size=8, page_num=PAGE_NUM, visualize=True,
+                      font_path='simfang.ttf', render_workers=2, queue_size=16, engine=None, native_text=True):
+    """
+    与 run_ocr 相同，但渲染、识别、写出三个阶段并行：渲染进程预先渲染页面，写出线程异步保存结果，
+    队列有界，长文档的内存占用保持平稳
+    :param render_workers: 渲染进程数
+    :param queue_size: 渲染队列和写出队列的容量（页数）
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    engine = engine or load_engine()
+    prepare, infer = prepare_functions(engine, native_text, visualize)
+    writer = OCRResultWriter(output_dir, visualize, font_path)
+    run_pipeline(pdf_paths, prepare, infer, writer, render_workers=render_workers,
+                 queue_size=queue_size, batch_size=batch_size, page_num=page_num)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched PP-OCR text detection and recognition for PDF files.")
+    parser.add_argument("pdfs", nargs="*", default=['print_text.pdf'], help="PDF files to recognize")
+    parser.add_argument("--output-dir", default=".", help="folder for pages_dict JSON and visualizations")
+    parser.add_argument("--batch-size", type=int, default=8, help="pages per detection/recognition batch")
+    parser.add_argument("--page-num", type=int, default=PAGE_NUM, help="pages to recognize per PDF (0: all)")
+    parser.add_argument("--no-visualize", dest="visualize", action="store_false",
+                        help="skip the result_page_N.jpg visualizations (saved by default)")
+    parser.add_argument("--font-path", default="simfang.ttf", help="font used by the visualization")
+    parser.add_argument("--render-workers", type=int, default=0,
+                        help="render pages in this many processes while OCR runs (0: render inline)")
+    parser.add_argument("--queue-size", type=int, default=16, help="max pages buffered between stages")
+    parser.add_argument("--ocr-only", action="store_true",
+                        help="always run OCR on whole pages instead of using the PDF text layer")
+    args = parser.parse_args()
+
+    native_text = not args.ocr_only
+    if args.render_workers > 0:
+        run_ocr_pipelined(args.pdfs, args.output_dir, args.batch_size, args.page_num, args.visualize,
+                          args.font_path, args.render_workers, args.queue_size, native_text=native_text)
+    else:
+        run_ocr(args.pdfs, args.output_dir, args.batch_size, args.page_num, args.visualize, args.font_path,
+                native_text=native_text)
+
+
+if __name__ == "__main__":
+    main()
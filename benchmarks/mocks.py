@@ -0,0 +1,93 @@
+"""
+基准测试使用的 CPU 模型替身：接口与真实模型一致，返回形状合理的结果，可设置模拟耗时，
+用于在没有 GPU、没有下载模型的环境中测量渲染、数据搬运、写出等非模型阶段的开销。
+"""
+import importlib.util
+import sys
+import time
+import types
+
+import numpy as np
+
+
+class MockTableModel:
+    """
+    paddlex 表格单元格检测模型的替身：predict(images, threshold, batch_size) 为每张图片返回规则网格的单元格框
+    """
+
+    def __init__(self, rows=8, cols=4, seconds_per_image=0.0):
+        self.rows = rows
+        self.cols = cols
+        self.seconds_per_image = seconds_per_image
+
+    def predict(self, images, threshold=0.3, batch_size=1):
+        if self.seconds_per_image:
+            time.sleep(self.seconds_per_image * len(images))
+        for image in images:
+            h, w = image.shape[:2]
+            xs = np.linspace(0, w, self.cols + 1)
+            ys = np.linspace(0, h, self.rows + 1)
+            boxes = [
+                {"cls_id": 0, "label": "cell", "score": 0.9,
+                 "coordinate": [float(xs[c]), float(ys[r]), float(xs[c + 1]), float(ys[r + 1])]}
+                for r in range(self.rows) for c in range(self.cols)
+            ]
+            yield {"boxes": boxes}
+
+
+class MockOCREngine:
+    """
+    BatchOCR 的替身：ocr_pages 为每张图片返回若干水平文本行，recognize 为每个裁剪图返回固定文本
+    """
+
+    def __init__(self, lines_per_page=20, seconds_per_image=0.0):
+        self.lines_per_page = lines_per_page
+        self.seconds_per_image = seconds_per_image
+
+    def ocr_pages(self, images):
+        if self.seconds_per_image:
+            time.sleep(self.seconds_per_image * len(images))
+        results = []
+        for image in images:
+            h, w = image.shape[:2]
+            step = h / (self.lines_per_page + 1)
+            results.append([
+                [[[0.1 * w, i * step], [0.9 * w, i * step], [0.9 * w, i * step + step / 2], [0.1 * w, i * step + step / 2]],
+                 ("mock text", 0.95)]
+                for i in range(1, self.lines_per_page + 1)
+            ])
+        return results
+
+    def recognize(self, crops):
+        if self.seconds_per_image:
+            time.sleep(self.seconds_per_image * len(crops))
+        return [("mock text", 0.95) for _ in crops]
+
+
+def _placeholder_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def _unavailable(*args, **kwargs):
+    raise RuntimeError("model packages are not installed; benchmarks use the mock models instead")
+
+
+def install_model_placeholders():
+    """
+    paddlex / paddleocr 未安装时注册占位模块，使在模块顶层导入它们的脚本可以被导入；
+    占位模块中的模型入口一经调用就报错，基准测试只通过上面的替身调用模型。已安装时不做任何事
+    """
+    if importlib.util.find_spec("paddlex") is None:
+        sys.modules["paddlex"] = _placeholder_module("paddlex", create_model=_unavailable)
+    if importlib.util.find_spec("paddleocr") is None:
+        sys.modules.update({
+            "paddleocr": _placeholder_module("paddleocr", PaddleOCR=_unavailable, draw_ocr=_unavailable),
+            "paddleocr.tools": _placeholder_module("paddleocr.tools"),
+            "paddleocr.tools.infer": _placeholder_module("paddleocr.tools.infer"),
+            "paddleocr.tools.infer.predict_system": _placeholder_module(
+                "paddleocr.tools.infer.predict_system", sorted_boxes=_unavailable),
+            "paddleocr.tools.infer.utility": _placeholder_module(
+                "paddleocr.tools.infer.utility", get_rotate_crop_image=_unavailable),
+        })
@@ -0,0 +1,403 @@
+"""
+仓库自带样例 PDF 上的各阶段基准测试：
+页面渲染（多个倍数）、JSON / 列式结果读取、批量画框、create_pdf 文本层合成、按 score 划分、
+PDF 类型分类，以及使用 CPU 模型替身（benchmarks/mocks.py）的 OCR、表格检测和 VLM 图片分析，
+渲染相关的阶段按类别目录（01-Academic_papers ... 07-Printing_plate 等）分别统计。
+
+每个基准在独立的子进程中运行，记录吞吐量（页/秒或样本/秒，取多次运行的中位数）和峰值 RSS；
+结果可以保存为 JSON，并与基线比较，吞吐量下降或峰值 RSS 上升超过容差时以非零状态退出。
+
+用法示例：
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --filter render --repeat 5
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import queue
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "pdf_classify_by_score"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mocks import MockOCREngine, MockTableModel, install_model_placeholders
+
+# 类别 -> 样例 PDF 所在的文件夹或文件（相对仓库根目录，文件夹递归查找）
+CATEGORIES = {
+    "01-Academic_papers": "01-Academic_papers",
+    "02-Docx": "02-Docx",
+    "03-PPT": "03-PPT",
+    "04-Table": "04-Table",
+    "05-report": "05-report",
+    "07-Printing_plate": "07-Printing_plate",
+    "PP-OCR": "PP-OCR/print_text.pdf",
+    "Create-pdf": "Create-pdf/fjny0110.pdf",
+}
+SAMPLE_JSON = os.path.join(ROOT, "Create-pdf", "fjny0110.json")
+SAMPLE_PDF = os.path.join(ROOT, "Create-pdf", "fjny0110.pdf")
+
+
+def category_pdfs(category):
+    path = os.path.join(ROOT, CATEGORIES[category])
+    if os.path.isfile(path):
+        return [path]
+    pdfs = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        pdfs.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+    return pdfs
+
+
+def count_pages(pdf_paths):
+    import fitz
+    total = 0
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as doc:
+            total += len(doc)
+    return total
+
+
+def load_script(relative_path, name):
+    """
+    按路径导入仓库中的脚本（文件名含空格或 & 时无法直接 import），
+    注册到 sys.modules 中，模块级函数才能被 pickle 传给渲染进程
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    install_model_placeholders()
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def reset_caches():
+    """清空进程内的渲染缓存、文件哈希和文档元数据缓存，每次运行都从冷状态开始"""
+    from pdf_utils import pdf_meta, render_cache
+    render_cache._default_cache = None
+    render_cache._file_hashes.clear()
+    pdf_meta._meta_cache.clear()
+
+
+# ---------------------------------------------------------------- 基准定义
+# 每个基准为 setup(tmp_dir) -> (run, 处理量)；run() 执行一次被测代码
+
+def render_benchmark(category, zoom):
+    def setup(tmp_dir):
+        import fitz
+        pdfs = category_pdfs(category)
+
+        def run():
+            for pdf_path in pdfs:
+                with fitz.open(pdf_path) as doc:
+                    for page in doc:
+                        page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return run, count_pages(pdfs)
+    return setup
+
+
+def bbox_benchmark(category):
+    def setup(tmp_dir):
+        import fitz
+        import numpy as np
+        from pdf_utils.bbox import draw_boxes
+        pdfs = category_pdfs(category)
+        # 以每页的单词框作为待绘制的框，没有文本层的页面使用规则网格
+        page_boxes = {}
+        for pdf_path in pdfs:
+            with fitz.open(pdf_path) as doc:
+                for page in doc:
+                    words = [w[:4] for w in page.get_text("words")]
+                    if not words:
+                        w, h = page.rect.width, page.rect.height
+                        words = [(x, y, x + w / 20, y + h / 50) for x in np.linspace(0, w, 20, endpoint=False)
+                                 for y in np.linspace(0, h, 50, endpoint=False)]
+                    page_boxes[(pdf_path, page.number)] = np.asarray(words, dtype=np.float64)
+
+        def run():
+            for pdf_path in pdfs:
+                with fitz.open(pdf_path) as doc:
+                    for page in doc:
+                        draw_boxes(page, page_boxes[(pdf_path, page.number)], color=(1, 0, 0))
+                    doc.tobytes()
+        return run, count_pages(pdfs)
+    return setup
+
+
+def ocr_benchmark(category, native_text):
+    def setup(tmp_dir):
+        import fitz
+        install_model_placeholders()
+        from pdf_utils.ocr import HybridOCR, plan_page, render_page
+        pdfs = category_pdfs(category)
+        engine = MockOCREngine()
+
+        def run():
+            reset_caches()
+            for pdf_path in pdfs:
+                with fitz.open(pdf_path) as doc:
+                    if native_text:
+                        HybridOCR(engine).ocr_pages([plan_page(page) for page in doc])
+                    else:
+                        engine.ocr_pages([render_page(page)[0] for page in doc])
+        return run, count_pages(pdfs)
+    return setup
+
+
+def table_benchmark(category):
+    def setup(tmp_dir):
+        module = load_script("Create-pdf/create_pdf-text&table.py", "create_pdf_text_table")
+        pdfs = category_pdfs(category)
+        model = MockTableModel()
+
+        def run():
+            reset_caches()
+            for pdf_path in pdfs:
+                module.detect_tables(pdf_path, model, tmp_dir, zoom=2, render_workers=1)
+        return run, count_pages(pdfs)
+    return setup
+
+
+def vlm_benchmark(category, mode):
+    def setup(tmp_dir):
+        from pdf_utils.vlm import MockVLMBackend
+        module = load_script("Create-pdf/pdf_image_extract.py", "pdf_image_extract")
+        pdfs = category_pdfs(category)
+
+        def run():
+            reset_caches()
+            analyzer = module.PDFImageAnalyzer(backend=MockVLMBackend(), batch_size=4)
+            for pdf_path in pdfs:
+                analyzer.process_pdf(pdf_path, mode=mode)
+        return run, count_pages(pdfs)
+    return setup
+
+
+def type_classify_benchmark(category):
+    def setup(tmp_dir):
+        module = load_script("pdf_type_classifier/classify_pdf_type.py", "classify_pdf_type")
+        pdfs = category_pdfs(category)
+
+        def run():
+            for pdf_path in pdfs:
+                module.classify_pdf(pdf_path)
+        return run, len(pdfs)
+    return setup
+
+
+def json_load_benchmark(kind, loops=50):
+    def setup(tmp_dir):
+        from pdf_utils.columnar import load_columnar, save_columnar
+        from pdf_utils.json_loader import load_fields, load_json
+        data = load_json(SAMPLE_JSON)
+        npz_path = os.path.join(tmp_dir, "sample.npz")
+        save_columnar(data, npz_path)
+
+        if kind == "full":
+            def load():
+                load_json(SAMPLE_JSON)
+        elif kind == "scores":
+            def load():
+                load_fields(SAMPLE_JSON, ["pages[*].score"])
+        else:
+            def load():
+                load_columnar(npz_path).page_scores()
+
+        # 单次读取不到一毫秒，重复多次以减小计时误差
+        def run():
+            for _ in range(loops):
+                load()
+        return run, len(data["pages"]) * loops
+    return setup
+
+
+def create_pdf_benchmark(tmp_dir):
+    module = load_script("Create-pdf/create_pdf-text&table.py", "create_pdf_text_table")
+    from pdf_utils.json_loader import load_json
+    data = load_json(SAMPLE_JSON)
+    output = os.path.join(tmp_dir, "synth.pdf")
+
+    def run():
+        reset_caches()
+        module.create_pdf(data, output, SAMPLE_PDF, font_name="Helvetica", align="center")
+    return run, len(data["pages"])
+
+
+def score_classify_benchmark(samples=200):
+    def setup(tmp_dir):
+        from classify_pdf_by_score import process_json_files
+        folder = os.path.join(tmp_dir, "shard")
+        os.makedirs(folder)
+        for i in range(samples):
+            shutil.copyfile(SAMPLE_JSON, os.path.join(folder, f"sample{i:05d}.json"))
+
+        def run():
+            process_json_files(folder, os.path.join(tmp_dir, "low"), os.path.join(tmp_dir, "common"),
+                               mode="manifest")
+        return run, samples
+    return setup
+
+
+def build_registry():
+    """
+    所有基准：名称 -> (setup, 处理量单位)
+    """
+    registry = {}
+    for category in CATEGORIES:
+        for zoom in (1, 2, 3):
+            registry[f"render_z{zoom}/{category}"] = (render_benchmark(category, zoom), "pages")
+        registry[f"bbox_draw/{category}"] = (bbox_benchmark(category), "pages")
+        registry[f"ocr_hybrid_mock/{category}"] = (ocr_benchmark(category, True), "pages")
+        registry[f"ocr_full_mock/{category}"] = (ocr_benchmark(category, False), "pages")
+        registry[f"table_detect_mock/{category}"] = (table_benchmark(category), "pages")
+        registry[f"vlm_regions_mock/{category}"] = (vlm_benchmark(category, "regions"), "pages")
+        registry[f"vlm_pages_mock/{category}"] = (vlm_benchmark(category, "pages"), "pages")
+        registry[f"type_classify/{category}"] = (type_classify_benchmark(category), "docs")
+    registry["json_load/full"] = (json_load_benchmark("full"), "pages")
+    registry["json_load/scores"] = (json_load_benchmark("scores"), "pages")
+    registry["json_load/columnar_scores"] = (json_load_benchmark("columnar"), "pages")
+    registry["create_pdf/fjny0110"] = (create_pdf_benchmark, "pages")
+    registry["score_classify/manifest"] = (score_classify_benchmark(), "samples")
+    return registry
+
+
+# ---------------------------------------------------------------- 运行与比较
+
+def _peak_rss_mb():
+    # 渲染进程等子进程的峰值也计入（取单个进程的最大值）
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_in_child(name, repeat, result_queue):
+    """子进程：准备数据后先预热一次，再计时 repeat 次"""
+    os.environ.pop("PDF_RENDER_CACHE_DIR", None)
+    # spawn 出的子进程会沿用 spawn 方式创建渲染进程，而按路径导入的脚本在新进程中无法按模块名导入，
+    # 支持 fork 的平台上恢复为 fork
+    if "fork" in mp.get_all_start_methods():
+        mp.set_start_method("fork", force=True)
+    try:
+        setup, unit = build_registry()[name]
+        with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull):
+            run, amount = setup(tmp_dir)
+            run()
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+        median = statistics.median(times)
+        result_queue.put({
+            "name": name,
+            "unit": unit,
+            "amount": amount,
+            "median_s": median,
+            "min_s": min(times),
+            "throughput": amount / median if median > 0 else float("inf"),
+            "peak_rss_mb": _peak_rss_mb(),
+        })
+    except Exception as e:
+        result_queue.put({"name": name, "error": f"{type(e).__name__}: {e}"})
+
+
+def run_benchmark(name, repeat=3):
+    """在独立的子进程中运行一个基准，峰值 RSS 只反映该基准本身"""
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=_run_in_child, args=(name, repeat, result_queue))
+    process.start()
+    while True:
+        try:
+            result = result_queue.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                result = {"name": name, "error": f"benchmark process exited with code {process.exitcode}"}
+                break
+    process.join()
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线比较
+    :return: 回归说明列表
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result["name"])
+        if base is None or "error" in result or "error" in base:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{result['name']}: throughput {result['throughput']:.1f} < "
+                               f"baseline {base['throughput']:.1f} {result['unit']}/s")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: peak RSS {result['peak_rss_mb']:.0f} MB > "
+                               f"baseline {base['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on the bundled sample PDFs.")
+    parser.add_argument("--filter", nargs="*", default=None, help="only run benchmarks whose name contains any of these")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (after one warm-up run)")
+    parser.add_argument("--output", default=None, help="save results as JSON (usable as a baseline)")
+    parser.add_argument("--baseline", default=None, help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative throughput drop / peak RSS growth before flagging a regression")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    args = parser.parse_args()
+
+    names = sorted(build_registry())
+    if args.filter:
+        names = [name for name in names if any(pattern in name for pattern in args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return
+
+    results = []
+    print(f"{'benchmark':<42} {'throughput':>18} {'median':>7} {'peak RSS':>9}")
+    for name in names:
+        result = run_benchmark(name, args.repeat)
+        results.append(result)
+        if "error" in result:
+            print(f"{name:<42} ERROR {result['error']}")
+        else:
+            print(f"{name:<42} {result['throughput']:>8.1f} {result['unit'] + '/s':<9}"
+                  f"{result['median_s'] * 1000:>7.1f}ms {result['peak_rss_mb']:>6.0f} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({result["name"]: result for result in results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
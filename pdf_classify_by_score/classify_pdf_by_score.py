@@ -4,50 +4,278 @@
 如果所有score大于这个阈值，则样本划分成正常质量的数据集
 """
 # 通过json文件进行划分（根据阈值），最后把json,pdf,ocr,tif文件都放入不同的文件中：
-import json
+import errno
+import fcntl
 import os
 import shutil
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_utils.columnar import COLUMNAR_EXT, load_columnar
+from pdf_utils.json_loader import load_fields
+from pdf_utils.wds import iter_tar_samples, TarShardWriter
 
-def process_json_files(input_folder, low_simple_folder, common_simple_folder):
+# 定义需要同时处理的文件扩展名（.npz 为 json 转换后的列式 OCR 结果，见 pdf_utils.columnar）
+EXTENSIONS = ['.ocr', '.pdf', '.tif', '.json', COLUMNAR_EXT]
+
+# 样本落盘方式：copy 复制文件；manifest 只写清单不处理文件；
+# hardlink/reflink/symlink 只创建链接，划分过程只有元数据开销
+ROUTE_MODES = ['copy', 'manifest', 'hardlink', 'reflink', 'symlink']
+
+# Linux ioctl FICLONE，用于在 btrfs/xfs 等文件系统上创建 reflink
+FICLONE = 0x40049409
+
+
+def load_page_scores(source):
+    """
+    只解码 JSON 中的 pages[*].score 字段；列式 .npz 文件直接内存映射 score 列
+    :param source: JSON / .npz 文件路径或 JSON bytes
+    :return: 每页的 score 列表
+    """
+    if isinstance(source, str) and source.endswith(COLUMNAR_EXT):
+        return load_columnar(source).page_scores()
+    return load_fields(source, ['pages[*].score'])['pages[*].score']
+
+
+def load_json_scores(json_path):
+    """
+    读取已解压文件夹中一个样本的每页 score：已转换为列式格式的样本读取内存映射的 score 列，不再解析 JSON；
+    旧版 float32 的 .npz 无法保证与 JSON 划分结果一致，提示后改为读取 JSON
+    :param json_path: 样本的 JSON 文件路径
+    :return: 每页的 score 列表
+    """
+    columnar_path = json_path[:-len('.json')] + COLUMNAR_EXT
+    if os.path.exists(columnar_path):
+        try:
+            return load_page_scores(columnar_path)
+        except ValueError as e:
+            print(f"Warning: ignoring {columnar_path} ({e}), reading {json_path} instead")
+    return load_page_scores(json_path)
+
+
+def load_sample_scores(files):
+    """
+    从 tar 分片中一个样本的成员读取每页 score，有列式 .npz 成员时优先使用
+    :param files: {扩展名: bytes}
+    :return: 每页的 score 列表
+    """
+    if COLUMNAR_EXT in files:
+        try:
+            return load_columnar(files[COLUMNAR_EXT]).page_scores()
+        except ValueError as e:
+            if '.json' not in files:
+                raise
+            print(f"Warning: ignoring {COLUMNAR_EXT} member ({e}), reading .json instead")
+    return load_page_scores(files['.json'])
+
+
+def classify_sample(page_scores, threshold=0.7):
+    """
+    对单个样本进行划分
+    :param page_scores: 每页的 score 列表（即 pages[*].score）
+    :param threshold: 阈值
+    :return: (划分结果 'low'/'common', 最小 score；没有任何 score 时为 None)
+    """
+    scores = [score for page in page_scores for score in page]
+    min_score = min(scores) if scores else None
+    if min_score is not None and min_score < threshold:
+        return 'low', min_score
+    return 'common', min_score
+
+
+def write_manifest(records, manifest_path):
+    """
+    将划分结果写为 TSV 清单文件
+    :param records: (key, bucket, min_score, source) 列表
+    :param manifest_path: 清单文件路径
+    """
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        f.write('key\tbucket\tmin_score\tsource\n')
+        for key, bucket, min_score, source in records:
+            score_str = '' if min_score is None else f'{min_score:.4f}'
+            f.write(f'{key}\t{bucket}\t{score_str}\t{source}\n')
+
+
+def read_manifest(manifest_path):
+    """
+    读取 TSV 清单文件
+    :param manifest_path: 清单文件路径
+    :return: (key, bucket, min_score, source) 列表
+    """
+    records = []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        next(f)  # 跳过表头
+        for line in f:
+            key, bucket, score_str, source = line.rstrip('\n').split('\t')
+            records.append((key, bucket, float(score_str) if score_str else None, source))
+    return records
+
+
+def reflink_file(src_file_path, dst_file_path):
+    """
+    使用 FICLONE 创建 reflink（写时复制），文件系统不支持时抛出 OSError
+    """
+    with open(src_file_path, 'rb') as src, open(dst_file_path, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(dst_file_path)
+            raise
+
+
+def route_file(src_file_path, dst_file_path, mode='copy'):
+    """
+    按指定方式将样本文件放入目标文件夹
+    :param src_file_path: 源文件路径
+    :param dst_file_path: 目标文件路径
+    :param mode: 'copy'/'hardlink'/'reflink'/'symlink'
+    :return: 实际使用的方式（hardlink/reflink 不可用时回退为 copy）
+    """
+    if os.path.lexists(dst_file_path):
+        os.remove(dst_file_path)
+    if mode == 'symlink':
+        os.symlink(os.path.abspath(src_file_path), dst_file_path)
+        return mode
+    if mode in ('hardlink', 'reflink'):
+        try:
+            if mode == 'hardlink':
+                os.link(src_file_path, dst_file_path)
+            else:
+                reflink_file(src_file_path, dst_file_path)
+            return mode
+        except OSError as e:
+            # 跨设备或文件系统不支持时回退为复制
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL):
+                raise
+    shutil.copy(src_file_path, dst_file_path)
+    return 'copy'
+
+
+def route_sample(input_folder, base_name, target_folder, mode='copy'):
+    """
+    将一个样本的 .ocr/.pdf/.tif/.json 文件放入目标文件夹
+    """
+    # 确保目标文件夹存在
+    if not os.path.exists(target_folder):
+        os.makedirs(target_folder)
+
+    for ext in EXTENSIONS:
+        src_file_path = os.path.join(input_folder, base_name + ext)
+        if os.path.exists(src_file_path):
+            used_mode = route_file(src_file_path, os.path.join(target_folder, base_name + ext), mode)
+            print(f"File {base_name + ext} has been routed to {target_folder} ({used_mode}).")
+
+
+def materialize_manifest(manifest_path, low_simple_folder, common_simple_folder, mode='hardlink'):
+    """
+    根据已有清单将样本落盘到 low/common 文件夹，无需重新解析 json
+    :param manifest_path: 清单文件路径
+    :param low_simple_folder: 低质量样本输出文件夹
+    :param common_simple_folder: 正常质量样本输出文件夹
+    :param mode: 'copy'/'hardlink'/'reflink'/'symlink'
+    """
+    for key, bucket, _, source in read_manifest(manifest_path):
+        if not os.path.isdir(source):
+            raise ValueError(f"Cannot materialize {key}: source {source} is not an extracted folder")
+        target_folder = low_simple_folder if bucket == 'low' else common_simple_folder
+        route_sample(source, key, target_folder, mode)
+
+
+def process_json_files(input_folder, low_simple_folder, common_simple_folder, threshold=0.7, filenames=None,
+                       mode='copy'):
+    """
+    划分已解压的分片文件夹
+    :param input_folder: 输入文件夹
+    :param low_simple_folder: 低质量样本输出文件夹
+    :param common_simple_folder: 正常质量样本输出文件夹
+    :param threshold: 阈值
+    :param filenames: 只处理这些 json 文件名（用于按样本块并行），None 表示处理整个文件夹
+    :param mode: 样本落盘方式，见 ROUTE_MODES
+    :return: (key, bucket, min_score, source) 列表
+    """
+    records = []
+    if filenames is None:
+        filenames = os.listdir(input_folder)
     # 遍历输入文件夹下的所有文件
-    for filename in os.listdir(input_folder):
+    for filename in filenames:
         if filename.endswith('.json'):
             base_name = filename[:-5]  # 去掉.json后缀
             input_file_path = os.path.join(input_folder, filename)
+            # 已转换为列式格式的样本读取内存映射的 score 列，不再解析 JSON
+            bucket, min_score = classify_sample(load_json_scores(input_file_path), threshold)
+            records.append((base_name, bucket, min_score, input_folder))
+            if mode == 'manifest':
+                continue
 
-            with open(input_file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            pages = data['pages']
+            if bucket == 'low':
+                target_folder = low_simple_folder
+            else:
+                target_folder = common_simple_folder
+            route_sample(input_folder, base_name, target_folder, mode)
+    return records
 
-            # 设置阈值
-            threshold = 0.7
 
-            # 检查是否有任意一个 score 小于阈值
-            has_low_score = any(
-                any(score < threshold for score in item['score'])
-                for item in pages
-            )
+# 直接读取 webdataset tar 分片进行划分，不需要先解压：
+def output_shard_name(tar_path):
+    """
+    输入分片对应的输出分片文件名：保留完整文件名，只去掉 .tar 及其后的压缩扩展名
+    （a.v1.tar 与 a.v2.tar 不会合并为同一个输出分片）
+    :param tar_path: 输入 tar 分片路径
+    :return: 输出分片文件名，如 idl-train-00002.tar
+    """
+    name = os.path.basename(tar_path)
+    stem = name[:name.rindex('.tar')] if '.tar' in name else os.path.splitext(name)[0]
+    return stem + '.tar'
 
-            if has_low_score:
-                target_folder = low_simple_folder
+
+def process_tar_shard(tar_path, low_simple_folder, common_simple_folder, threshold=0.7, mode='copy'):
+    """
+    以流方式读取 idl-train-xxxxx.tar 分片，按样本 key 将 .json/.pdf/.tif/.ocr 成员分组，
+    根据 json 中的 score 划分后直接写入输出 tar 分片，全程不解压到临时目录。
+    :param tar_path: 输入 tar 分片路径
+    :param low_simple_folder: 低质量样本分片的输出文件夹
+    :param common_simple_folder: 正常质量样本分片的输出文件夹
+    :param threshold: 阈值
+    :param mode: 'copy' 写出 low/common 分片；'manifest' 只返回划分结果
+    :return: (key, bucket, min_score, source) 列表
+    """
+    records = []
+    if mode == 'manifest':
+        for key, files in iter_tar_samples(tar_path, extensions={'.json', COLUMNAR_EXT}):
+            bucket, min_score = classify_sample(load_sample_scores(files), threshold)
+            records.append((key, bucket, min_score, tar_path))
+        return records
+    if mode != 'copy':
+        raise ValueError(f"Route mode '{mode}' is only supported for extracted folders, not tar shards")
+
+    shard_name = output_shard_name(tar_path)
+    os.makedirs(low_simple_folder, exist_ok=True)
+    os.makedirs(common_simple_folder, exist_ok=True)
+
+    with TarShardWriter(os.path.join(low_simple_folder, shard_name)) as low_writer, \
+            TarShardWriter(os.path.join(common_simple_folder, shard_name)) as common_writer:
+        for key, files in iter_tar_samples(tar_path, extensions=set(EXTENSIONS)):
+            if '.json' not in files and COLUMNAR_EXT not in files:
+                print(f"[DEBUG] Sample {key} has no .json member, skip it.")
+                continue
+            bucket, min_score = classify_sample(load_sample_scores(files), threshold)
+            records.append((key, bucket, min_score, tar_path))
+            if bucket == 'low':
+                low_writer.write_sample(key, files)
             else:
-                target_folder = common_simple_folder
+                common_writer.write_sample(key, files)
 
-            # 确保目标文件夹存在
-            if not os.path.exists(target_folder):
-                os.makedirs(target_folder)
+        print(f"Shard {tar_path}: {low_writer.sample_count} low quality samples, "
+              f"{common_writer.sample_count} common quality samples.")
+    return records
 
-            # 定义需要同时处理的文件扩展名
-            extensions = ['.ocr', '.pdf', '.tif', '.json']
-            for ext in extensions:
-                src_file_path = os.path.join(input_folder, base_name + ext)
-                if os.path.exists(src_file_path):
-                    shutil.copy(src_file_path, os.path.join(target_folder, base_name + ext))
-                    print(f"File {base_name + ext} has been copied to {target_folder}.")
 
 if __name__ == "__main__":
-    input_folder = 'idl-train-00002'
+    input_folder = 'idl-train-00002'  # 也可以直接填写 tar 分片路径，如 'idl-train-00002.tar'
     low_simple_folder = 'low_quality_samples'
     common_simple_folder = 'common_quality_samples'
-    process_json_files(input_folder, low_simple_folder, common_simple_folder)
\ No newline at end of file
+    if input_folder.endswith('.tar'):
+        process_tar_shard(input_folder, low_simple_folder, common_simple_folder)
+    else:
+        process_json_files(input_folder, low_simple_folder, common_simple_folder)
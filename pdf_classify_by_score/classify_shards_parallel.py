@@ -0,0 +1,142 @@
+"""
+多分片并行划分：
+将多个 idl-train-xxxxx 分片（tar 文件或已解压的文件夹）分配到进程池中处理，
+合并所有进程的划分结果为一个 low/common 清单，并统计每个进程的吞吐量。
+
+用法示例：
+    python classify_shards_parallel.py 'shards/idl-train-*.tar' --workers 64 --manifest manifest.tsv
+    python classify_shards_parallel.py 'idl-train-*' --mode hardlink
+"""
+import argparse
+import glob
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from classify_pdf_by_score import ROUTE_MODES, output_shard_name, process_json_files, process_tar_shard, write_manifest
+
+
+def expand_inputs(patterns):
+    """
+    展开命令行中的分片路径或 glob
+    :param patterns: 路径或 glob 列表
+    :return: 去重并排序后的分片路径列表
+    """
+    paths = set()
+    for pattern in patterns:
+        matched = glob.glob(pattern)
+        if not matched and os.path.exists(pattern):
+            matched = [pattern]
+        if not matched:
+            print(f"[WARN] No shard matches '{pattern}'.")
+        paths.update(matched)
+    return sorted(paths)
+
+
+def build_tasks(shard_paths, chunk_size):
+    """
+    构建任务列表：tar 分片只能顺序读取，整个分片作为一个任务；
+    已解压的文件夹按 chunk_size 个样本切分为多个任务
+    :param shard_paths: 分片路径列表
+    :param chunk_size: 每个任务包含的样本数，0 表示整个文件夹作为一个任务
+    :return: (分片路径, json 文件名列表或 None) 列表
+    """
+    tasks = []
+    for shard_path in shard_paths:
+        if os.path.isdir(shard_path):
+            filenames = sorted(f for f in os.listdir(shard_path) if f.endswith('.json'))
+            if chunk_size > 0:
+                for start in range(0, len(filenames), chunk_size):
+                    tasks.append((shard_path, filenames[start:start + chunk_size]))
+            else:
+                tasks.append((shard_path, filenames))
+        else:
+            tasks.append((shard_path, None))
+    return tasks
+
+
+def run_task(shard_path, filenames, low_simple_folder, common_simple_folder, threshold, mode):
+    """
+    进程池中执行的单个任务
+    :return: 包含划分结果、耗时和进程号的字典
+    """
+    start = time.perf_counter()
+    if filenames is None:
+        records = process_tar_shard(shard_path, low_simple_folder, common_simple_folder, threshold, mode)
+    else:
+        records = process_json_files(shard_path, low_simple_folder, common_simple_folder,
+                                     threshold, filenames=filenames, mode=mode)
+    return {
+        "shard": shard_path,
+        "records": records,
+        "elapsed": time.perf_counter() - start,
+        "pid": os.getpid(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify many idl-wds shards by OCR score in parallel.")
+    parser.add_argument("shards", nargs="+", help="shard tar files, extracted shard folders or glob patterns")
+    parser.add_argument("--low", default="low_quality_samples", help="output folder for low quality samples")
+    parser.add_argument("--common", default="common_quality_samples", help="output folder for common quality samples")
+    parser.add_argument("--threshold", type=float, default=0.7, help="score threshold")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=500,
+                        help="samples per task for extracted folders (0: one task per folder)")
+    parser.add_argument("--manifest", default="manifest.tsv", help="merged low/common manifest path")
+    parser.add_argument("--mode", choices=ROUTE_MODES, default="copy",
+                        help="how routed samples are written: copy files, manifest only, or hardlink/reflink/symlink "
+                             "(link modes only apply to extracted folders)")
+    args = parser.parse_args()
+
+    shard_paths = expand_inputs(args.shards)
+    # 链接方式只适用于已解压的文件夹，提交任务前检查，避免文件夹样本已落盘后 tar 任务才报错、清单无法写出
+    tar_paths = [path for path in shard_paths if not os.path.isdir(path)]
+    if args.mode not in ('copy', 'manifest') and tar_paths:
+        parser.error(f"--mode {args.mode} only applies to extracted folders, got tar shards: "
+                     f"{', '.join(tar_paths[:3])}{' ...' if len(tar_paths) > 3 else ''}")
+    if args.mode == 'copy':
+        # 每个 tar 分片写出同名的 low/common 分片，不同目录下同名的分片会互相覆盖
+        sources = defaultdict(list)
+        for path in tar_paths:
+            sources[output_shard_name(path)].append(path)
+        clashes = [paths for paths in sources.values() if len(paths) > 1]
+        if clashes:
+            parser.error("tar shards map to the same output shard name: "
+                         + "; ".join(" and ".join(paths) for paths in clashes[:3]))
+    tasks = build_tasks(shard_paths, args.chunk_size)
+    print(f"{len(shard_paths)} shards, {len(tasks)} tasks, {args.workers} workers.")
+
+    all_records = []
+    worker_stats = defaultdict(lambda: {"tasks": 0, "samples": 0, "elapsed": 0.0})
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(run_task, shard_path, filenames, args.low, args.common, args.threshold, args.mode)
+            for shard_path, filenames in tasks
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            all_records.extend(result["records"])
+            stats = worker_stats[result["pid"]]
+            stats["tasks"] += 1
+            stats["samples"] += len(result["records"])
+            stats["elapsed"] += result["elapsed"]
+    total_elapsed = time.perf_counter() - start
+
+    all_records.sort(key=lambda record: (record[3], record[0]))
+    write_manifest(all_records, args.manifest)
+
+    low_count = sum(1 for record in all_records if record[1] == 'low')
+    print(f"Manifest saved to {args.manifest}: {low_count} low, {len(all_records) - low_count} common.")
+    for pid, stats in sorted(worker_stats.items()):
+        rate = stats["samples"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+        print(f"Worker {pid}: {stats['tasks']} tasks, {stats['samples']} samples, "
+              f"{stats['elapsed']:.2f}s busy, {rate:.1f} samples/s")
+    overall_rate = len(all_records) / total_elapsed if total_elapsed > 0 else 0.0
+    print(f"Total: {len(all_records)} samples in {total_elapsed:.2f}s ({overall_rate:.1f} samples/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+低分行的局部重识别（ROI re-OCR）：
+classify_pdf_by_score 只要样本中有一行 score 低于阈值就把整个样本划入低质量数据集。
+这里只取出低分行的 poly，在原 PDF 中以更高的倍数只渲染这些区域，
+把所有裁剪图合并成一批重新做方向分类和识别，得分提高的行写回 text/score，
+修复后的 json 再按阈值重新划分，代价只是整页 OCR 的一小部分。
+
+用法示例：
+    python repair_low_score_lines.py low_quality_samples --output repaired_samples --threshold 0.7 --zoom 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classify_pdf_by_score import classify_sample
+from pdf_utils.json_loader import load_json
+
+
+def find_low_lines(pages, threshold=0.7):
+    """
+    找出 score 低于阈值且有 poly 的行
+    :param pages: pages_dict 中的 pages 列表
+    :return: [(页序号, 行序号), ...]
+    """
+    targets = []
+    for page_idx, page in enumerate(pages):
+        polys = page.get('poly', [])
+        for line_idx, score in enumerate(page.get('score', [])):
+            if score < threshold and line_idx < len(polys) and polys[line_idx]:
+                targets.append((page_idx, line_idx))
+    return targets
+
+
+def poly_to_clip(poly, page, margin=2.0):
+    """
+    将一行的 poly 换算为可见页面坐标中的裁剪矩形
+    :param poly: {"X":, "Y":} 页面比例坐标（idl-wds），或 PaddleOCR 渲染图上的 [x, y] 像素坐标
+    :param page: PyMuPDF页面对象
+    :param margin: 四周留白（pt）
+    :return: fitz.Rect，get_pixmap 的 clip 使用可见页面坐标
+    """
+    if isinstance(poly[0], dict):
+        xs = [point["X"] * page.rect.width for point in poly]
+        ys = [point["Y"] * page.rect.height for point in poly]
+    else:
+        from pdf_utils.ocr import page_render_matrix  # 只有 PaddleOCR 像素坐标需要渲染矩阵
+        scale = page_render_matrix(page).a
+        xs = [point[0] / scale for point in poly]
+        ys = [point[1] / scale for point in poly]
+    rect = fitz.Rect(min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin)
+    return rect & page.rect
+
+
+def render_line_crops(doc, pages, targets, zoom=4, margin=2.0):
+    """
+    以 zoom 倍只渲染目标行所在的区域
+    :return: 与 targets 对应的 BGR ndarray 列表，区域为空的行为 None
+    """
+    mat = fitz.Matrix(zoom, zoom)
+    crops = []
+    for page_idx, line_idx in targets:
+        page = doc[page_idx]
+        clip = poly_to_clip(pages[page_idx]['poly'][line_idx], page, margin)
+        if clip.is_empty:
+            crops.append(None)
+            continue
+        pix = page.get_pixmap(matrix=mat, clip=clip, colorspace=fitz.csRGB, alpha=False)
+        rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3)
+        crops.append(np.ascontiguousarray(rgb[:, :, ::-1]))
+    return crops
+
+
+def repair_sample(json_data, pdf_path, engine, threshold=0.7, zoom=4, margin=2.0):
+    """
+    重识别一个样本中的低分行，原地更新 json_data
+    :param json_data: pages_dict
+    :param pdf_path: 样本对应的 PDF 文件路径
+    :param engine: 提供 recognize(crops) -> [(text, score), ...] 的识别引擎（如 pdf_utils.ocr.BatchOCR）
+    :return: (低分行数, 得分提高并写回的行数)
+    """
+    pages = json_data.get('pages', [])
+    targets = find_low_lines(pages, threshold)
+    if not targets:
+        return 0, 0
+    with fitz.open(pdf_path) as doc:
+        targets = [(page_idx, line_idx) for page_idx, line_idx in targets if page_idx < len(doc)]
+        crops = render_line_crops(doc, pages, targets, zoom, margin)
+
+    valid = [i for i, crop in enumerate(crops) if crop is not None]
+    rec_res = engine.recognize([crops[i] for i in valid])
+    improved = 0
+    for i, (text, score) in zip(valid, rec_res):
+        page_idx, line_idx = targets[i]
+        page = pages[page_idx]
+        if score > page['score'][line_idx] and line_idx < len(page.get('text', [])):
+            page['text'][line_idx] = text
+            page['score'][line_idx] = float(score)
+            improved += 1
+    return len(targets), improved
+
+
+def repair_folder(input_folder, output_folder, engine, threshold=0.7, zoom=4, margin=2.0):
+    """
+    修复文件夹中所有样本的低分行，修复后的 json 写入 output_folder（文件名不变）
+    :return: (key, 修复前划分, 修复后划分, 修复后最小 score) 列表
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    results = []
+    total_lines = total_improved = 0
+    start = time.perf_counter()
+    for filename in sorted(os.listdir(input_folder)):
+        if not filename.endswith('.json'):
+            continue
+        base_name = filename[:-5]
+        pdf_path = os.path.join(input_folder, base_name + '.pdf')
+        if not os.path.exists(pdf_path):
+            print(f"[DEBUG] Sample {base_name} has no .pdf file, skip it.")
+            continue
+        json_data = load_json(os.path.join(input_folder, filename))
+        before, _ = classify_sample([page.get('score', []) for page in json_data.get('pages', [])], threshold)
+        try:
+            n_lines, improved = repair_sample(json_data, pdf_path, engine, threshold, zoom, margin)
+        except Exception as e:
+            print(f"Error repairing {base_name}: {e}")
+            continue
+        after, min_score = classify_sample([page.get('score', []) for page in json_data.get('pages', [])], threshold)
+        total_lines += n_lines
+        total_improved += improved
+
+        with open(os.path.join(output_folder, filename), 'w', encoding='utf-8') as f:
+            json.dump(json_data, f, ensure_ascii=False)
+        results.append((base_name, before, after, min_score))
+        print(f"{base_name}: {improved}/{n_lines} low score lines improved, {before} -> {after}")
+
+    elapsed = time.perf_counter() - start
+    recovered = sum(1 for _, before, after, _ in results if before == 'low' and after == 'common')
+    print(f"Repaired {len(results)} samples in {elapsed:.2f}s: {total_improved}/{total_lines} lines improved, "
+          f"{recovered} samples recovered to common.")
+    return results
+
+
+def load_engine(**ocr_kwargs):
+    # 只有真正重识别时才加载 PaddleOCR
+    from pdf_utils.ocr import BatchOCR
+    return BatchOCR(use_angle_cls=True, **ocr_kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-recognize only the low-score lines of idl-wds samples.")
+    parser.add_argument("input", help="folder with <key>.json and <key>.pdf samples")
+    parser.add_argument("--output", default="repaired_samples", help="folder for the repaired json files")
+    parser.add_argument("--threshold", type=float, default=0.7, help="lines below this score are re-recognized")
+    parser.add_argument("--zoom", type=float, default=4, help="render zoom for the line crops")
+    parser.add_argument("--margin", type=float, default=2.0, help="padding around each line in points")
+    args = parser.parse_args()
+
+    repair_folder(args.input, args.output, load_engine(), args.threshold, args.zoom, args.margin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+OCR score 列式索引：
+一次遍历所有分片，把每个样本 pages[*].score 中的逐行 score 抽取到列式存储（NumPy npz 或 Parquet），
+同时计算每个样本的 min/mean/分位数统计。之后调整阈值时无需重新解析 json，
+对全量数据做阈值扫描只需要毫秒级时间。
+
+用法示例：
+    python score_index.py build 'shards/idl-train-*.tar' --output scores.npz
+    python score_index.py sweep scores.npz --thresholds 0.5 0.6 0.7 0.8 0.9
+    python score_index.py split scores.npz --threshold 0.65 --manifest manifest_065.tsv
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classify_pdf_by_score import load_json_scores, load_sample_scores, write_manifest
+from classify_shards_parallel import expand_inputs
+from pdf_utils.columnar import COLUMNAR_EXT
+from pdf_utils.wds import iter_tar_samples
+
+# 每个样本保存的分位数
+PERCENTILES = (5, 25, 50)
+
+
+def iter_sample_scores(shard_path):
+    """
+    遍历一个分片（tar 文件或已解压文件夹）中的样本
+    :param shard_path: 分片路径
+    :return: 生成器，产出 (key, 该样本所有行的 score 列表)
+    """
+    if os.path.isdir(shard_path):
+        for filename in sorted(os.listdir(shard_path)):
+            if filename.endswith('.json'):
+                page_scores = load_json_scores(os.path.join(shard_path, filename))
+                yield filename[:-5], [score for page in page_scores for score in page]
+    else:
+        for key, files in iter_tar_samples(shard_path, extensions={'.json', COLUMNAR_EXT}):
+            page_scores = load_sample_scores(files)
+            yield key, [score for page in page_scores for score in page]
+
+
+def segment_stats(scores, offsets):
+    """
+    按样本分段向量化计算 min/mean/分位数
+    :param scores: 所有行的 score，float64 一维数组
+    :param offsets: 每个样本在 scores 中的起止位置，长度为样本数 + 1
+    :return: {列名: 每个样本的统计值数组}，没有 score 的样本统计值为 NaN
+    """
+    counts = np.diff(offsets)
+    sample_ids = np.repeat(np.arange(len(counts)), counts)
+    non_empty = counts > 0
+    starts = offsets[:-1][non_empty]
+
+    stats = {"n_lines": counts.astype(np.int32)}
+    # 统计值保持 float64：float32 会把 0.699999988079071 这类阈值附近的 score 舍入到阈值上，
+    # 与 classify_sample 的划分结果不一致
+    min_scores = np.full(len(counts), np.nan, dtype=np.float64)
+    mean_scores = np.full(len(counts), np.nan, dtype=np.float64)
+    if len(scores):
+        min_scores[non_empty] = np.minimum.reduceat(scores, starts)
+        mean_scores[non_empty] = np.add.reduceat(scores, starts) / counts[non_empty]
+    stats["min"] = min_scores
+    stats["mean"] = mean_scores
+
+    # 段内排序后按最近秩取分位数
+    sorted_scores = scores[np.lexsort((scores, sample_ids))]
+    for q in PERCENTILES:
+        values = np.full(len(counts), np.nan, dtype=np.float64)
+        if len(scores):
+            rank = np.floor(q / 100 * (counts[non_empty] - 1)).astype(np.int64)
+            values[non_empty] = sorted_scores[starts + rank]
+        stats[f"p{q:02d}"] = values
+    return stats
+
+
+def build_index(shard_paths):
+    """
+    一次遍历构建列式索引
+    :param shard_paths: 分片路径列表
+    :return: {列名: 数组}
+    """
+    keys, sources, offsets, chunks = [], [], [0], []
+    for shard_path in shard_paths:
+        for key, scores in iter_sample_scores(shard_path):
+            keys.append(key)
+            sources.append(shard_path)
+            chunks.append(np.asarray(scores, dtype=np.float64))
+            offsets.append(offsets[-1] + len(scores))
+
+    scores = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    index = {
+        "key": np.asarray(keys, dtype=str),
+        "source": np.asarray(sources, dtype=str),
+        "offsets": offsets,
+        "scores": scores,
+    }
+    index.update(segment_stats(scores, offsets))
+    return index
+
+
+def save_index(index, output_path):
+    """
+    保存索引：.parquet 后缀保存为 Parquet（需要 pyarrow），否则保存为 npz
+    """
+    if output_path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        offsets = index["offsets"]
+        columns = {name: index[name] for name in index if name not in ("offsets", "scores")}
+        columns["scores"] = pa.ListArray.from_arrays(pa.array(offsets, pa.int64()), pa.array(index["scores"]))
+        pq.write_table(pa.table(columns), output_path)
+    else:
+        np.savez(output_path, **index)
+
+
+def load_index(index_path):
+    """
+    读取 save_index 保存的索引
+    :return: {列名: 数组}
+    """
+    if index_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(index_path)
+        index = {name: table.column(name).to_numpy() for name in table.column_names if name != "scores"}
+        scores = table.column("scores").combine_chunks()
+        index["offsets"] = scores.offsets.to_numpy().astype(np.int64)
+        index["scores"] = scores.flatten().to_numpy()
+    else:
+        with np.load(index_path) as data:
+            index = {name: data[name] for name in data.files}
+    if index["min"].dtype != np.float64:
+        raise ValueError(f"{index_path} stores scores as {index['min'].dtype}, which rounds scores near the "
+                         f"threshold; rebuild it with: python score_index.py build ... --output {index_path}")
+    return index
+
+
+def threshold_sweep(min_scores, thresholds):
+    """
+    对多个阈值统计 low/common 样本数。min 排序一次后每个阈值只需一次二分查找
+    :param min_scores: 每个样本的最小 score（NaN 表示没有 score，划分为 common）
+    :param thresholds: 阈值列表
+    :return: (阈值, low 样本数, common 样本数) 列表
+    """
+    sorted_min = np.sort(min_scores[~np.isnan(min_scores)])
+    low_counts = np.searchsorted(sorted_min, np.asarray(thresholds, dtype=np.float64), side='left')
+    total = len(min_scores)
+    return [(t, int(low), int(total - low)) for t, low in zip(thresholds, low_counts)]
+
+
+def split_index(index, threshold):
+    """
+    按单个阈值划分索引中的样本，规则与 classify_sample 一致（最小 score 低于阈值为 low）
+    :param index: load_index 读取的索引
+    :param threshold: 阈值
+    :return: [(key, 'low'/'common', 最小 score 或 None, 分片路径), ...]
+    """
+    min_scores = index["min"]
+    is_low = min_scores < np.float64(threshold)  # NaN 比较结果为 False，划分为 common
+    return [
+        (key, 'low' if low else 'common', None if np.isnan(score) else float(score), source)
+        for key, low, score, source in zip(index["key"], is_low, min_scores, index["source"])
+    ]
+
+
+def print_sweep(rows, bar_width=40):
+    """
+    打印各阈值下的桶大小直方图
+    """
+    print(f"{'threshold':>9}  {'low':>9}  {'common':>9}  {'low%':>6}")
+    for threshold, low, common in rows:
+        total = low + common
+        ratio = low / total if total else 0.0
+        bar = '#' * int(round(ratio * bar_width))
+        print(f"{threshold:>9.3f}  {low:>9d}  {common:>9d}  {ratio:>6.1%}  |{bar:<{bar_width}}|")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar OCR score index with instant threshold sweeps.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="index pages[*].score of every sample")
+    build_parser.add_argument("shards", nargs="+", help="shard tar files, extracted shard folders or glob patterns")
+    build_parser.add_argument("--output", default="scores.npz", help="index path (.npz or .parquet)")
+
+    sweep_parser = subparsers.add_parser("sweep", help="report bucket sizes for many thresholds")
+    sweep_parser.add_argument("index")
+    sweep_parser.add_argument("--thresholds", type=float, nargs="+",
+                              default=[round(0.05 * i, 2) for i in range(10, 20)])
+
+    split_parser = subparsers.add_parser("split", help="write a low/common manifest for one threshold")
+    split_parser.add_argument("index")
+    split_parser.add_argument("--threshold", type=float, default=0.7)
+    split_parser.add_argument("--manifest", default="manifest.tsv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "build":
+        index = build_index(expand_inputs(args.shards))
+        save_index(index, args.output)
+        print(f"Indexed {len(index['key'])} samples, {len(index['scores'])} lines "
+              f"in {time.perf_counter() - start:.2f}s -> {args.output}")
+        return
+
+    index = load_index(args.index)
+    if args.command == "sweep":
+        rows = threshold_sweep(index["min"], args.thresholds)
+        print_sweep(rows)
+    else:
+        records = split_index(index, args.threshold)
+        n_low = sum(1 for record in records if record[1] == 'low')
+        write_manifest(records, args.manifest)
+        print(f"Manifest saved to {args.manifest}: {n_low} low, {len(records) - n_low} common.")
+    print(f"Done in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
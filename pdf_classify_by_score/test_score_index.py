@@ -0,0 +1,48 @@
+"""
+score 索引与 classify_sample 划分一致性测试：python -m pytest pdf_classify_by_score
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from classify_pdf_by_score import classify_sample
+from score_index import build_index, load_index, save_index, split_index, threshold_sweep
+
+# PaddleOCR 输出的 float32 转 float64 形式的 score，float32 下会舍入为 0.7
+NEAR_THRESHOLD = 0.699999988079071
+
+
+def test_score_just_below_threshold_is_low_everywhere(tmp_path):
+    shard = tmp_path / "shard"
+    shard.mkdir()
+    samples = {
+        "near": [[0.95, NEAR_THRESHOLD], [0.99]],
+        "high": [[0.9, 0.8]],
+        "empty": [],
+    }
+    for key, pages in samples.items():
+        (shard / f"{key}.json").write_text(json.dumps({"pages": [{"score": page} for page in pages]}))
+
+    expected = {key: classify_sample(pages, 0.7)[0] for key, pages in samples.items()}
+    assert expected == {"near": "low", "high": "common", "empty": "common"}
+
+    index_path = str(tmp_path / "scores.npz")
+    save_index(build_index([str(shard)]), index_path)
+    index = load_index(index_path)
+
+    assert threshold_sweep(index["min"], [0.7]) == [(0.7, 1, 2)]
+    records = split_index(index, 0.7)
+    assert {key: bucket for key, bucket, _, _ in records} == expected
+    assert dict((key, score) for key, _, score, _ in records)["near"] == NEAR_THRESHOLD
+
+
+def test_float32_index_is_rejected(tmp_path):
+    index_path = str(tmp_path / "legacy.npz")
+    np.savez(index_path, key=np.asarray(["a"]), source=np.asarray(["s"]), offsets=np.asarray([0, 1]),
+             scores=np.asarray([0.5], dtype=np.float32), min=np.asarray([0.5], dtype=np.float32))
+    with pytest.raises(ValueError, match="rebuild"):
+        load_index(index_path)
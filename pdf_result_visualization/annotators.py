@@ -0,0 +1,58 @@
+"""
+pdfa-eng-wds / idl-wds 样本的标注绘制函数，供单文件可视化脚本和批量可视化命令共用
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_utils.bbox import draw_boxes, percent_to_pixel_array
+
+# pdfa 图层定义：(图层名称, 从页面内容中取bbox列表的函数, 颜色)
+PDFA_LAYERS = [
+    ("words", lambda content: content['words']['bbox'], (1, 0, 0)),  # 单词边界框（红色）
+    ("lines", lambda content: content['lines']['bbox'], (1, 1, 0)),  # 行边界框（黄色）
+    ("images_bbox", lambda content: content['images_bbox'], (0, 1, 0)),  # 图像边界框（绿色）
+    ("images_bbox_no_text_overlap", lambda content: content['images_bbox_no_text_overlap'], (0, 0, 1)),  # 无文本重叠图像边界框（蓝色）
+]
+
+
+def annotate_pdfa(doc, data, use_annots=False):
+    """
+    在所有页面上绘制 pdfa 的全部图层，每个图层放入一个可选内容组（OCG）
+    :param doc: 已打开的PyMuPDF文档，原地修改
+    :param data: 解析后的JSON数据
+    :param use_annots: True 时为每个框单独添加矩形注释（较慢），默认整页一次性绘制
+    """
+    layer_xrefs = {name: doc.add_ocg(name, on=True) for name, _, _ in PDFA_LAYERS}
+
+    page_count = min(len(doc), len(data['pages']))
+    for page_num in range(page_count):
+        content = data['pages'][page_num]
+        page = doc.load_page(page_num)
+        page_width = page.rect.width
+        page_height = page.rect.height
+
+        for name, get_bboxes, color in PDFA_LAYERS:
+            rects = percent_to_pixel_array(get_bboxes(content), page_width, page_height)
+            draw_boxes(page, rects, color=color, oc=layer_xrefs[name], use_annots=use_annots)
+
+
+def annotate_idl(doc, data, use_annots=False):
+    """
+    在所有页面上绘制 idl 的文本行边界框（红色）
+    :param doc: 已打开的PyMuPDF文档，原地修改
+    :param data: 解析后的JSON数据
+    :param use_annots: True 时为每个框单独添加矩形注释（较慢），默认整页一次性绘制
+    """
+    page_count = min(len(doc), len(data['pages']))
+    for page_num in range(page_count):
+        content = data['pages'][page_num]
+        page = doc.load_page(page_num)
+        rects = percent_to_pixel_array(content['bbox'], page.rect.width, page.rect.height)
+        draw_boxes(page, rects, color=(1, 0, 0), use_annots=use_annots)  # 红色
+
+
+ANNOTATORS = {
+    "pdfa": annotate_pdfa,
+    "idl": annotate_idl,
+}
@@ -0,0 +1,228 @@
+"""
+批量可视化：
+输入一个已解压的分片文件夹或 tar 分片，按样本 key 配对 PDF 和 JSON，
+在进程池中并行绘制标注并输出，支持断点续跑（输出已是最新的样本会被跳过），并输出每个文档的耗时。
+输出方式：
+    pdf     每个样本输出一个带标注的 PDF
+    thumbs  每个样本输出一个文件夹，按页保存低 DPI 的 WebP/JPEG 缩略图
+    contact 将所有样本的页面缩略图拼接为 contact sheet，便于快速人工审核
+
+用法示例：
+    python batch_visualize.py pdfa-eng-train-0000.tar --dataset pdfa --output result --workers 16
+    python batch_visualize.py idl-train-00002 --dataset idl --output result --timings timings.tsv
+    python batch_visualize.py idl-train-00002.tar --dataset idl --output qa --output-mode contact
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from annotators import ANNOTATORS
+from pdf_utils.contact_sheet import IMAGE_FORMATS, ContactSheetWriter, pixmap_to_image, save_image
+from pdf_utils.json_loader import load_json, loads
+from pdf_utils.wds import iter_tar_samples
+
+
+OUTPUT_MODES = ['pdf', 'thumbs', 'contact']
+
+
+def output_path_for(output_dir, key, output_mode='pdf'):
+    """输出路径（pdf 模式为文件，thumbs 模式为文件夹），tar 中带目录前缀的 key 展平为文件名"""
+    name = key.replace('/', '_')
+    return os.path.join(output_dir, name + '.pdf' if output_mode == 'pdf' else name)
+
+
+def is_up_to_date(output_path, source_mtime):
+    """输出文件存在且不早于输入时视为最新"""
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= source_mtime
+
+
+def iter_folder_samples(input_folder):
+    """
+    遍历已解压的分片文件夹
+    :return: 生成器，产出 (key, pdf路径, json路径, 输入的最新修改时间)
+    """
+    for filename in sorted(os.listdir(input_folder)):
+        if not filename.endswith('.json'):
+            continue
+        key = filename[:-5]
+        pdf_path = os.path.join(input_folder, key + '.pdf')
+        json_path = os.path.join(input_folder, filename)
+        if not os.path.exists(pdf_path):
+            print(f"[DEBUG] Sample {key} has no .pdf file, skip it.")
+            continue
+        yield key, pdf_path, json_path, max(os.path.getmtime(pdf_path), os.path.getmtime(json_path))
+
+
+def iter_shard_samples(tar_path):
+    """
+    以流方式遍历 tar 分片，PDF 和 JSON 以 bytes 形式传给工作进程
+    :return: 生成器，产出 (key, pdf bytes, json bytes, tar 分片的修改时间)
+    """
+    tar_mtime = os.path.getmtime(tar_path)
+    for key, files in iter_tar_samples(tar_path, extensions={'.pdf', '.json'}):
+        if '.pdf' not in files or '.json' not in files:
+            print(f"[DEBUG] Sample {key} is missing .pdf or .json, skip it.")
+            continue
+        yield key, files['.pdf'], files['.json'], tar_mtime
+
+
+def save_thumbnails(doc, output_dir, dpi, image_format, quality):
+    """
+    将文档每一页按低 DPI 渲染并保存为缩略图。先写入临时文件夹再整体改名，中断时不会留下残缺输出
+    """
+    tmp_dir = output_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for page_num, page in enumerate(doc):
+        pix = page.get_pixmap(dpi=dpi, alpha=False)
+        save_image(pixmap_to_image(pix), os.path.join(tmp_dir, f"page_{page_num + 1:04d}"), image_format, quality)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+
+
+def render_contact_cells(doc, cell_size):
+    """
+    按 contact sheet 的格子大小渲染每一页，返回原始 RGB 数据，由主进程拼接
+    :return: (宽, 高, RGB bytes) 列表
+    """
+    cell_width, cell_height = cell_size
+    cells = []
+    for page in doc:
+        zoom = min(cell_width / page.rect.width, cell_height / page.rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        cells.append((pix.width, pix.height, pix.samples))
+    return cells
+
+
+def render_sample(key, pdf_source, json_source, output_path, dataset, use_annots, output_mode='pdf', options=None):
+    """
+    工作进程中绘制一个样本
+    :param pdf_source: PDF 文件路径或 bytes
+    :param json_source: JSON 文件路径或 bytes
+    :param output_mode: 'pdf'/'thumbs'/'contact'
+    :param options: thumbs/contact 模式的参数：dpi、image_format、quality、cell_size
+    :return: (key, 页数, 耗时秒数, 错误信息或 None, contact 模式下的缩略图数据或 None)
+    """
+    start = time.perf_counter()
+    options = options or {}
+    try:
+        data = loads(json_source) if isinstance(json_source, bytes) else load_json(json_source)
+        if isinstance(pdf_source, bytes):
+            doc = fitz.open(stream=pdf_source, filetype='pdf')
+        else:
+            doc = fitz.open(pdf_source)
+        page_count = len(doc)
+        ANNOTATORS[dataset](doc, data, use_annots=use_annots)
+        cells = None
+        if output_mode == 'thumbs':
+            save_thumbnails(doc, output_path, options['dpi'], options['image_format'], options['quality'])
+        elif output_mode == 'contact':
+            cells = render_contact_cells(doc, options['cell_size'])
+        else:
+            # 先写临时文件再替换，保证中断时不会留下被当作最新的残缺输出
+            tmp_path = output_path + '.tmp'
+            doc.save(tmp_path, garbage=1, deflate=True)
+            os.replace(tmp_path, output_path)
+        doc.close()
+        return key, page_count, time.perf_counter() - start, None, cells
+    except Exception as e:
+        return key, 0, time.perf_counter() - start, str(e), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render annotated PDFs for every sample of a shard in parallel.")
+    parser.add_argument("input", help="extracted shard folder or shard tar file")
+    parser.add_argument("--dataset", choices=sorted(ANNOTATORS), required=True, help="annotation schema")
+    parser.add_argument("--output", default="result", help="output folder")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--use-annots", action="store_true", help="draw one annotation per box (slow)")
+    parser.add_argument("--force", action="store_true", help="re-render samples whose output is up to date")
+    parser.add_argument("--timings", help="write per-document timings to this TSV file")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default="pdf",
+                        help="annotated PDFs, per-page thumbnails, or contact sheets")
+    parser.add_argument("--dpi", type=int, default=48, help="thumbnail resolution for --output-mode thumbs")
+    parser.add_argument("--image-format", choices=sorted(IMAGE_FORMATS), default="webp")
+    parser.add_argument("--quality", type=int, default=70, help="WebP/JPEG quality")
+    parser.add_argument("--cell-size", type=int, nargs=2, default=[240, 320], metavar=("WIDTH", "HEIGHT"),
+                        help="contact sheet cell size in pixels")
+    parser.add_argument("--sheet-grid", type=int, nargs=2, default=[8, 6], metavar=("COLS", "ROWS"),
+                        help="contact sheet grid")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    options = {
+        "dpi": args.dpi,
+        "image_format": args.image_format,
+        "quality": args.quality,
+        "cell_size": tuple(args.cell_size),
+    }
+    sheet_writer = None
+    if args.output_mode == 'contact':
+        sheet_writer = ContactSheetWriter(args.output, cell_size=tuple(args.cell_size), cols=args.sheet_grid[0],
+                                          rows=args.sheet_grid[1], image_format=args.image_format,
+                                          quality=args.quality)
+    if os.path.isdir(args.input):
+        samples = iter_folder_samples(args.input)
+    else:
+        samples = iter_shard_samples(args.input)
+
+    timings = []
+    skipped = 0
+    start = time.perf_counter()
+
+    def collect(done_futures):
+        for future in done_futures:
+            key, page_count, elapsed, error, cells = future.result()
+            if error is not None:
+                print(f"[ERROR] {key}: {error}")
+            else:
+                print(f"{key}: {page_count} pages in {elapsed:.3f}s")
+            if cells is not None:
+                thumbnails = [Image.frombytes("RGB", (width, height), samples) for width, height, samples in cells]
+                sheet_writer.add_document(key, thumbnails)
+            timings.append((key, page_count, elapsed, error))
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        pending = set()
+        for key, pdf_source, json_source, source_mtime in samples:
+            output_path = output_path_for(args.output, key, args.output_mode)
+            if sheet_writer is not None:
+                up_to_date = key in sheet_writer.done_keys
+            else:
+                up_to_date = is_up_to_date(output_path, source_mtime)
+            if not args.force and up_to_date:
+                skipped += 1
+                continue
+            # 限制在途任务数量，tar 输入时内存中最多保留 2 * workers 个样本
+            if len(pending) >= 2 * args.workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(render_sample, key, pdf_source, json_source, output_path,
+                                        args.dataset, args.use_annots, args.output_mode, options))
+        done, _ = wait(pending)
+        collect(done)
+    if sheet_writer is not None:
+        sheet_writer.flush()
+    total_elapsed = time.perf_counter() - start
+
+    if args.timings:
+        with open(args.timings, 'w', encoding='utf-8') as f:
+            f.write('key\tpages\tseconds\terror\n')
+            for key, page_count, elapsed, error in timings:
+                f.write(f"{key}\t{page_count}\t{elapsed:.4f}\t{error or ''}\n")
+
+    failed = sum(1 for timing in timings if timing[3] is not None)
+    total_pages = sum(timing[1] for timing in timings)
+    print(f"Rendered {len(timings) - failed} documents ({total_pages} pages), {failed} failed, "
+          f"{skipped} up to date, in {total_elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,111 +1,37 @@
-# 红色黄色框在不同一个pdf中
-import fitz  # PyMuPDF
-import json
-
-# 打开PDF文件路径
-local_pdf_path = "raw_data/0759470.pdf"
-
-# 加载JSON文件
-local_json_path = "raw_data/0759470.json"
-with open(local_json_path, 'r') as file:
-    data = json.load(file)
-
-content = data['pages'][0]
-
-words_bbox_percentage = content['words']['bbox']
-lines_bbox_percentage = content['lines']['bbox']
-images_bbox_percentage = content['images_bbox']
-images_bbox_no_text_overlap_percentage = content['images_bbox_no_text_overlap']
-
-def percent_to_pixel(bbox_percentage, page_width, page_height):
-    """将百分比格式的bbox转换为像素值"""
-    left = bbox_percentage[0] * page_width
-    top = bbox_percentage[1] * page_height
-    right = left + (bbox_percentage[2] * page_width)
-    bottom = top + (bbox_percentage[3] * page_height)
-    return [left, top, right, bottom]
-
-
-# 处理并保存带有红色框的PDF
-doc = fitz.open(local_pdf_path)
-page = doc.load_page(0)
-page_width = page.rect.width
-page_height = page.rect.height
-
-# 绘制单词边界框（红色）
-for idx, bbox_percent in enumerate(words_bbox_percentage):
-    bbox = percent_to_pixel(bbox_percent, page_width, page_height)
-    annot = page.add_rect_annot(bbox)
-    annot.set_colors(stroke=[1, 0, 0])  # 红色
-    annot.update()
-
-    point = fitz.Point(bbox[0], bbox[1])
-    page.insert_text(point, str(idx + 1), fontsize=8, color=(1, 0, 0))
-
-# 保存带有红色框的PDF文档
-output_red_pdf_path = "result/annotated_with_red_boxes_0759470.pdf"
-doc.save(output_red_pdf_path)
-doc.close()
-
-# 处理并保存带有黄色框的PDF
-doc = fitz.open(local_pdf_path)
-page = doc.load_page(0)
-
-# 绘制行边界框（黄色）
-for idx, bbox_percent in enumerate(lines_bbox_percentage):
-    bbox = percent_to_pixel(bbox_percent, page_width, page_height)
-    annot = page.add_rect_annot(bbox)
-    annot.set_colors(stroke=[1, 1, 0])  # 黄色
-    annot.update()
+# 红色/黄色/绿色/蓝色框分别放在同一个pdf的不同图层（OCG）中，可在阅读器中单独开关
+import os
+import sys
 
-    point = fitz.Point(bbox[0], bbox[1])
-    page.insert_text(point, str(idx + 1), fontsize=8, color=(1, 1, 0))
-
-# 保存带有黄色框的PDF文档
-output_yellow_pdf_path = "result/annotated_with_yellow_boxes_0759470.pdf"
-doc.save(output_yellow_pdf_path)
-doc.close()
-
-
-# 处理并保存带有绿色框的PDF
-doc = fitz.open(local_pdf_path)
-page = doc.load_page(0)
-# 绘制图像边界框（绿色）
-for idx, bbox_percent in enumerate(images_bbox_percentage):
-    bbox = percent_to_pixel(bbox_percent, page_width, page_height)
-    annot = page.add_rect_annot(bbox)
-    annot.set_colors(stroke=[0, 1, 0])  # 绿色
-    annot.update()
-
-    point = fitz.Point(bbox[0], bbox[1])
-    page.insert_text(point, str(idx + 1), fontsize=8, color=(0, 1, 0))
-
-output_green_pdf_path = "result/annotated_with_green_boxes_0759470.pdf"
-doc.save(output_green_pdf_path)
-doc.close()
-
-# 处理并保存带有蓝色框（代表images_bbox_no_text_overlap）的PDF
-doc = fitz.open(local_pdf_path)
-page = doc.load_page(0)
-
-# 绘制无文本重叠图像边界框（蓝色）
-for idx, bbox_percent in enumerate(images_bbox_no_text_overlap_percentage):
-    bbox = percent_to_pixel(bbox_percent, page_width, page_height)
-    annot = page.add_rect_annot(bbox)
-    annot.set_colors(stroke=[0, 0, 1])  # 蓝色
-    annot.update()
-
-    point = fitz.Point(bbox[0], bbox[1])
-    page.insert_text(point, str(idx + 1), fontsize=8, color=(0, 0, 1))
-
-output_blue_pdf_path = "result/annotated_with_blue_boxes_0759470.pdf"
-doc.save(output_blue_pdf_path)
-doc.close()
-
-
-
-print(f"Red boxes saved to {output_red_pdf_path}")
-print(f"Yellow boxes saved to {output_yellow_pdf_path}")
-print(f"Green boxes saved to {output_green_pdf_path}")
-print(f"Blue boxes saved to {output_blue_pdf_path}")
+import fitz  # PyMuPDF
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from annotators import annotate_pdfa
+from pdf_utils.json_loader import load_json
+
+
+def annotate_pdf(pdf_path, data, output_pdf_path, use_annots=False):
+    """
+    只打开一次PDF，在所有页面上绘制全部图层，每个图层放入一个可选内容组（OCG），保存为一个输出文件
+    :param pdf_path: 原始PDF文件路径
+    :param data: 解析后的JSON数据
+    :param output_pdf_path: 输出PDF文件路径
+    :param use_annots: True 时为每个框单独添加矩形注释（较慢），默认整页一次性绘制
+    """
+    doc = fitz.open(pdf_path)
+    annotate_pdfa(doc, data, use_annots=use_annots)
+    doc.save(output_pdf_path, garbage=1, deflate=True)
+    doc.close()
+
+
+if __name__ == "__main__":
+    # 打开PDF文件路径
+    local_pdf_path = "raw_data/0759470.pdf"
+
+    # 加载JSON文件
+    local_json_path = "raw_data/0759470.json"
+    data = load_json(local_json_path)
+
+    output_pdf_path = "result/annotated_layers_0759470.pdf"
+    annotate_pdf(local_pdf_path, data, output_pdf_path)
+    print(f"Words (red), lines (yellow), images (green) and "
+          f"images_bbox_no_text_overlap (blue) layers saved to {output_pdf_path}")
@@ -0,0 +1,3 @@
+"""
+各处理脚本共用的工具模块。
+"""
@@ -0,0 +1,99 @@
+"""
+bbox 的批量坐标转换与绘制：
+整页的 bbox 数组一次性用 NumPy 转换为像素坐标，所有矩形和序号标签生成为一段内容流，
+通过一次 Shape 提交写入页面，避免每个框单独创建注释。逐个添加注释的方式仍可通过 use_annots 选择。
+"""
+import fitz  # PyMuPDF
+import numpy as np
+
+
+def percent_to_pixel_array(bboxes, page_width, page_height):
+    """
+    将百分比格式 [left, top, width, height] 的 bbox 数组批量转换为像素坐标
+    :param bboxes: 形状为 (N, 4) 的数组或列表
+    :param page_width: 页面宽度
+    :param page_height: 页面高度
+    :return: 形状为 (N, 4) 的 float64 数组，每行为 [left, top, right, bottom]
+    """
+    boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    rects = np.empty_like(boxes)
+    rects[:, 0] = boxes[:, 0] * page_width
+    rects[:, 1] = boxes[:, 1] * page_height
+    rects[:, 2] = rects[:, 0] + boxes[:, 2] * page_width
+    rects[:, 3] = rects[:, 1] + boxes[:, 3] * page_height
+    return rects
+
+
+# 序号标签使用的 Base-14 字体在页面资源中的名称
+LABEL_FONT = "helv"
+
+
+def _to_pdf_space(page, x, y):
+    """
+    将页面坐标数组批量变换到 PDF 坐标系，与 Shape 中的 ipctm 变换一致
+    """
+    a, b, c, d, e, f = tuple(~page.transformation_matrix)
+    return a * x + c * y + e, b * x + d * y + f
+
+
+def _rect_operators(page, rects):
+    """
+    生成所有矩形的 PDF 路径操作符（"x y w h re"），坐标变换与 Shape.draw_rect 一致
+    """
+    x0, y0, x1, y1 = rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3]
+    # 矩形左下角 (x0, y1) 变换到 PDF 坐标系
+    px, py = _to_pdf_space(page, x0, y1)
+    ops = np.column_stack((px, py, x1 - x0, y1 - y0))
+    return "".join("%g %g %g %g re\n" % tuple(row) for row in ops.round(3).tolist())
+
+
+def _label_operators(page, rects, color, fontsize):
+    """
+    生成所有序号标签的文本对象，基线起点为框的左上角，与 page.insert_text 的位置一致
+    """
+    px, py = _to_pdf_space(page, rects[:, 0], rects[:, 1])
+    lines = "".join(
+        "1 0 0 1 %g %g Tm (%d) Tj\n" % (x, y, idx + 1)
+        for idx, (x, y) in enumerate(np.column_stack((px, py)).round(3).tolist())
+    )
+    color_ops = "%g %g %g rg\n" % tuple(color)
+    return f"BT\n/{LABEL_FONT} {fontsize:g} Tf\n{color_ops}{lines}ET\n"
+
+
+def draw_boxes(page, rects, color, labels=True, fontsize=8, width=1, oc=0, use_annots=False):
+    """
+    在页面上绘制一组矩形框及其序号标签
+    :param page: PyMuPDF页面对象
+    :param rects: 形状为 (N, 4) 的像素坐标数组 [left, top, right, bottom]
+    :param color: 颜色 (R, G, B)，范围为 0-1
+    :param labels: 是否在框的左上角绘制从 1 开始的序号
+    :param fontsize: 序号字体大小
+    :param width: 线宽
+    :param oc: 可选内容组（OCG）的 xref，0 表示不放入图层
+    :param use_annots: True 时为每个框单独添加矩形注释（旧的绘制方式，可在阅读器中逐个编辑）
+    """
+    rects = np.asarray(rects, dtype=np.float64).reshape(-1, 4)
+    if len(rects) == 0:
+        return
+
+    if use_annots:
+        for idx, bbox in enumerate(rects.tolist()):
+            annot = page.add_rect_annot(bbox)
+            annot.set_colors(stroke=color)
+            annot.set_border(width=width)
+            if oc:
+                annot.set_oc(oc)
+            annot.update()
+            if labels:
+                page.insert_text(fitz.Point(bbox[0], bbox[1]), str(idx + 1), fontsize=fontsize, color=color, oc=oc)
+        return
+
+    # 文本对象放在路径之前，整段内容由 Shape.finish 统一加上颜色、线宽和 OCG 标记
+    shape = page.new_shape()
+    if labels:
+        page.insert_font(fontname=LABEL_FONT)
+        shape.draw_cont = _label_operators(page, rects, color, fontsize)
+    shape.draw_cont += _rect_operators(page, rects)
+    shape.updateRect(fitz.Rect(rects[:, 0].min(), rects[:, 1].min(), rects[:, 2].max(), rects[:, 3].max()))
+    shape.finish(color=color, width=width, closePath=False, oc=oc)
+    shape.commit()
@@ -0,0 +1,134 @@
+"""
+可续跑的逐页结果输出：每页结果完成后立即追加为 JSONL 的一行，
+并在检查点索引（<输出文件>.index，TSV：pdf_sha1  page_number  status）中登记该页，
+status 为 done（已完成）或 error（结果带有错误）。旧版两列的索引行视为 done。
+重新运行时跳过已完成的 (PDF 内容哈希, 页码)，长时间运行中断后不必重做已完成的页面；出错的页面会重试。
+
+写入顺序为先结果后索引，中断时可能出现一条结果已写入但未登记的记录。打开检查点时如果 JSONL 中有
+未登记为 done 的记录（出错待重试或中断残留），先整理 JSONL：每个 (pdf_sha1, page_number) 只保留
+最后一条已完成的记录，出错的记录在重试后由新结果取代，读取 JSONL 时不会看到同一页的重复记录。
+"""
+import json
+import os
+
+
+class PageCheckpoint:
+    """
+    JSONL 结果文件 + 页面状态索引
+    """
+
+    def __init__(self, output_path, fsync=False, key_fields=("pdf_sha1", "page_number")):
+        """
+        :param output_path: JSONL 结果文件路径，索引文件为 output_path + ".index"
+        :param fsync: 每页写入后是否 fsync（更可靠，但更慢）
+        :param key_fields: 结果记录中表示 (PDF 内容哈希, 页码) 的字段，整理 JSONL 时使用
+        """
+        self.output_path = output_path
+        self.index_path = output_path + ".index"
+        self.fsync = fsync
+        self.key_fields = key_fields
+        for path in (self.output_path, self.index_path):
+            _truncate_partial_line(path)
+        status = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) in (2, 3) and parts[1].isdigit():
+                        status[(parts[0], int(parts[1]))] = parts[2] if len(parts) == 3 else "done"
+        self.completed = {key for key, value in status.items() if value == "done"}
+        if os.path.exists(self.output_path) and _count_lines(self.output_path) != len(self.completed):
+            self._compact()
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        self._output = open(self.output_path, "a", encoding="utf-8")
+        self._index = open(self.index_path, "a", encoding="utf-8")
+
+    def _compact(self):
+        """
+        重写 JSONL 和索引：只保留已完成页面的最后一条记录，去掉出错待重试的记录和中断残留的重复记录
+        """
+        records = {}
+        with open(self.output_path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                key = tuple(record.get(field) for field in self.key_fields)
+                if key in self.completed:
+                    records.pop(key, None)
+                    records[key] = line
+        for path, lines in ((self.output_path, records.values()),
+                            (self.index_path, (f"{key[0]}\t{key[1]}\tdone\n" for key in records))):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        self.completed = set(records)
+
+    def is_done(self, pdf_hash, page_number):
+        return (pdf_hash, page_number) in self.completed
+
+    def write(self, pdf_hash, page_number, record, done=True):
+        """
+        追加一页的结果
+        :param pdf_hash: PDF 内容哈希
+        :param page_number: 页码
+        :param record: 可 JSON 序列化的结果字典，需包含 key_fields 字段
+        :param done: 是否登记为已完成；出错的页面登记为 error，续跑时重试并取代这条记录
+        """
+        self._output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._flush(self._output)
+        self._index.write(f"{pdf_hash}\t{page_number}\t{'done' if done else 'error'}\n")
+        self._flush(self._index)
+        if done:
+            self.completed.add((pdf_hash, page_number))
+
+    def _flush(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def close(self):
+        self._output.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _count_lines(path):
+    """统计文件行数（按块计数换行符，不解析内容）"""
+    count = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            count += chunk.count(b"\n")
+    return count
+
+
+def _truncate_partial_line(path):
+    """截掉文件末尾不完整的行（进程在写入一行的中途被终止时产生）"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # 从末尾向前找到最后一个换行符
+        pos = size
+        while pos > 0:
+            step = min(1 << 16, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                f.truncate(pos - step + newline + 1)
+                return
+            pos -= step
+        f.truncate(0)
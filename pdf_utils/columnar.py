@@ -0,0 +1,345 @@
+"""
+pages_dict / OCR 结果的列式二进制格式（未压缩的 .npz），读取时按成员内存映射，不需要解析 JSON：
+- points       float32 (点数, 2)       所有 poly 的顶点，按行依次拼接
+- poly_offsets int32   (行数 + 1)      每行 poly 在 points 中的起止位置（没有 poly 的行长度为 0）
+- page_offsets int32   (页数 + 1)      每页的行在行数组中的起止位置
+- score        float64 (行数,)         每行的 score，缺失为 NaN（与 JSON 解码结果逐位一致，按阈值划分时不会因舍入改变结果）
+- bbox         float32 (行数, 4)       每行的 bbox（仅当原 JSON 有 bbox 时保存）
+- text_data    uint8                   所有行文本的 UTF-8 字节拼接（字符串表）
+- text_offsets int64   (行数 + 1)      每行文本在 text_data 中的起止字节
+- poly_style   str                     "dict"（{"X":, "Y":} 点，如 idl-wds）或 "list"（[x, y] 点，如 PaddleOCR）
+- fields       str 数组                原 JSON 每页包含的字段，转换回 JSON 时保持一致
+旧版以 float32 保存 score 的文件读取时报错，需要用 to-npz 从 JSON 重新生成。
+
+用法示例：
+    python -m pdf_utils.columnar to-npz fjny0110.json fjny0110.npz
+    python -m pdf_utils.columnar to-json fjny0110.npz fjny0110_restored.json
+    python -m pdf_utils.columnar check fjny0110.json fjny0110.npz
+"""
+import argparse
+import io
+import json
+import math
+import mmap
+import re
+import struct
+import zipfile
+
+import numpy as np
+
+from pdf_utils.json_loader import load_json
+
+COLUMNAR_EXT = ".npz"
+PAGE_FIELDS = ("text", "poly", "score", "bbox")
+
+
+def pages_dict_to_columns(data):
+    """
+    将 pages_dict 转换为列式数组
+    :param data: {'pages': [{'text': [...], 'poly': [...], 'score': [...], 'bbox': [...]}, ...]}
+    :return: {列名: ndarray}
+    """
+    pages = data.get("pages", [])
+    fields = [field for field in PAGE_FIELDS if any(field in page for page in pages)]
+    page_offsets = [0]
+    poly_offsets = [0]
+    points, scores, bboxes, texts = [], [], [], []
+    poly_style = "list"
+
+    for page in pages:
+        page_texts = page.get("text", [])
+        page_polys = page.get("poly", [])
+        page_scores = page.get("score", [])
+        page_bboxes = page.get("bbox", [])
+        n_lines = max(len(page_texts), len(page_polys), len(page_scores), len(page_bboxes))
+        for i in range(n_lines):
+            texts.append(page_texts[i] if i < len(page_texts) else "")
+            scores.append(page_scores[i] if i < len(page_scores) else np.nan)
+            if "bbox" in fields:
+                bboxes.append(page_bboxes[i] if i < len(page_bboxes) else [np.nan] * 4)
+            for point in page_polys[i] if i < len(page_polys) else ():
+                if isinstance(point, dict):
+                    poly_style = "dict"
+                    points.append((point["X"], point["Y"]))
+                else:
+                    points.append((point[0], point[1]))
+            poly_offsets.append(len(points))
+        page_offsets.append(page_offsets[-1] + n_lines)
+
+    encoded = [text.encode("utf-8") for text in texts]
+    text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=text_offsets[1:])
+    columns = {
+        "points": np.asarray(points, dtype=np.float32).reshape(-1, 2),
+        "poly_offsets": np.asarray(poly_offsets, dtype=np.int32),
+        "page_offsets": np.asarray(page_offsets, dtype=np.int32),
+        "score": np.asarray(scores, dtype=np.float64),
+        "text_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "text_offsets": text_offsets,
+        "poly_style": np.array(poly_style),
+        "fields": np.array(fields),
+    }
+    if "bbox" in fields:
+        columns["bbox"] = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+    return columns
+
+
+def save_columnar(data, path):
+    """
+    保存为列式格式（不压缩，读取时可以内存映射）
+    :param data: pages_dict
+    :param path: 输出 .npz 路径
+    """
+    np.savez(path, **pages_dict_to_columns(data))
+
+
+# .npy 头中的 dtype、存储顺序和形状（np.savez 写出的头总是这个字段顺序）
+_NPY_HEADER_RE = re.compile(rb"'descr':\s*'([^']+)',\s*'fortran_order':\s*(True|False),\s*'shape':\s*\(([^)]*)\)")
+
+
+def _mmap_npz(path):
+    """
+    内存映射未压缩 .npz 中的每个数组：整个文件只映射一次，成员以 ZIP_STORED 方式连续存放，
+    依次跳过 zip 本地文件头和 .npy 头，每个成员是映射上的 np.frombuffer 视图，不经过 zipfile 和 literal_eval。
+    遇到压缩成员、数据描述符或无法识别的 .npy 头时改用 _read_npz_members
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    offset = 0
+    while buffer[offset:offset + 4] == b"PK\x03\x04":
+        # 本地文件头：固定 30 字节 + 文件名 + 扩展字段
+        flags, method = struct.unpack_from("<HH", buffer, offset + 6)
+        name_len, extra_len = struct.unpack_from("<HH", buffer, offset + 26)
+        name = buffer[offset + 30:offset + 30 + name_len].decode("utf-8")
+        start = offset + 30 + name_len + extra_len
+        if method != zipfile.ZIP_STORED or flags & 0x08 or buffer[start:start + 6] != b"\x93NUMPY":
+            return _read_npz_members(path)
+        if buffer[start + 6] == 1:
+            (header_len,) = struct.unpack_from("<H", buffer, start + 8)
+            header_start = start + 10
+        else:
+            (header_len,) = struct.unpack_from("<I", buffer, start + 8)
+            header_start = start + 12
+        match = _NPY_HEADER_RE.search(buffer[header_start:header_start + header_len])
+        if match is None:
+            return _read_npz_members(path)
+        dtype = np.dtype(match.group(1).decode("ascii"))
+        if dtype.hasobject:
+            raise ValueError(f"{path}: object arrays cannot be memory-mapped")
+        shape = tuple(int(dim) for dim in match.group(3).split(b",") if dim.strip())
+        count = math.prod(shape)
+        data_start = header_start + header_len
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start) if count else np.empty(0, dtype)
+        arrays[name[:-4] if name.endswith(".npy") else name] = array.reshape(
+            shape, order="F" if match.group(2) == b"True" else "C")
+        offset = data_start + count * dtype.itemsize
+    return arrays
+
+
+def _read_npz_members(path):
+    """
+    通过 zipfile 读取 .npz 的每个成员：未压缩的数值成员映射到同一个文件映射上，其余直接读取
+    """
+    arrays = {}
+    buffer = None
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(io.BytesIO(archive.read(info)))
+                continue
+            # 本地文件头：固定 30 字节 + 文件名 + 扩展字段
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path}: object arrays cannot be memory-mapped")
+            if math.prod(shape) == 0 or dtype.kind == "U":
+                # 空数组和字符串元数据直接读取
+                arrays[name] = np.lib.format.read_array(io.BytesIO(archive.read(info)))
+                continue
+            if buffer is None:
+                buffer = np.memmap(path, dtype=np.uint8, mode="r")
+            array = np.frombuffer(buffer, dtype=dtype, count=math.prod(shape), offset=f.tell())
+            arrays[name] = array.reshape(shape, order="F" if fortran_order else "C")
+    return arrays
+
+
+class ColumnarPages:
+    """
+    列式 OCR 结果的只读视图。data['pages'] 按需构造每页的字典，
+    可以直接代替 load_json 得到的 pages_dict 使用
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.points = arrays["points"]
+        self.poly_offsets = arrays["poly_offsets"]
+        self.page_offsets = arrays["page_offsets"]
+        self.score = arrays["score"]
+        if self.score.dtype != np.float64:
+            # 旧版文件以 float32 保存 score，无法可靠还原 JSON 中的原值
+            # （0.699999988079071 会变成 0.7，按 0.7 划分时从 low 变成 common），直接拒绝而不是猜测
+            raise ValueError(f"columnar file stores scores as {self.score.dtype}; regenerate it from the JSON "
+                             f"with: python -m pdf_utils.columnar to-npz <json> <npz>")
+        self.bbox = arrays.get("bbox")
+        self.text_data = arrays["text_data"]
+        self.text_offsets = arrays["text_offsets"]
+        self.poly_style = str(arrays["poly_style"])
+        self.fields = [str(field) for field in arrays["fields"]]
+
+    @property
+    def page_count(self):
+        return len(self.page_offsets) - 1
+
+    def __getitem__(self, key):
+        if key != "pages":
+            raise KeyError(key)
+        return _PageSequence(self)
+
+    def get(self, key, default=None):
+        return self["pages"] if key == "pages" else default
+
+    def text(self, line):
+        start, end = self.text_offsets[line], self.text_offsets[line + 1]
+        return bytes(self.text_data[start:end]).decode("utf-8")
+
+    def page_scores(self):
+        """
+        每页的 score 列表（等价于 JSON 的 pages[*].score），缺失的 score 不计入
+        """
+        scores = np.asarray(self.score)
+        pages = []
+        for start, end in zip(self.page_offsets[:-1], self.page_offsets[1:]):
+            chunk = scores[start:end]
+            pages.append(chunk[~np.isnan(chunk)].tolist())
+        return pages
+
+    def page(self, page_idx):
+        """
+        构造一页的 pages_dict 字典
+        """
+        start, end = int(self.page_offsets[page_idx]), int(self.page_offsets[page_idx + 1])
+        page = {}
+        if "text" in self.fields:
+            page["text"] = [self.text(i) for i in range(start, end)]
+        if "poly" in self.fields:
+            polys = []
+            for i in range(start, end):
+                pts = np.asarray(self.points[self.poly_offsets[i]:self.poly_offsets[i + 1]]).tolist()
+                if self.poly_style == "dict":
+                    polys.append([{"X": x, "Y": y} for x, y in pts])
+                else:
+                    polys.append(pts)
+            page["poly"] = polys
+        if "score" in self.fields:
+            page["score"] = np.asarray(self.score[start:end]).tolist()
+        if "bbox" in self.fields and self.bbox is not None:
+            page["bbox"] = np.asarray(self.bbox[start:end]).tolist()
+        return page
+
+    def to_pages_dict(self):
+        return {"pages": [self.page(i) for i in range(self.page_count)]}
+
+
+class _PageSequence:
+    """ColumnarPages 中 pages 的惰性序列"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return self.columns.page_count
+
+    def __getitem__(self, page_idx):
+        if page_idx < 0:
+            page_idx += len(self)
+        if not 0 <= page_idx < len(self):
+            raise IndexError(page_idx)
+        return self.columns.page(page_idx)
+
+    def __iter__(self):
+        return (self.columns.page(i) for i in range(len(self)))
+
+
+def load_columnar(source, mmap=True):
+    """
+    读取列式 OCR 结果
+    :param source: .npz 文件路径或 bytes（如 tar 分片中的成员）
+    :param mmap: source 为路径时是否内存映射
+    :return: ColumnarPages
+    :raise ValueError: 旧版以 float32 保存 score 的文件，需要从 JSON 重新生成
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with np.load(io.BytesIO(source)) as npz:
+            return ColumnarPages({name: npz[name] for name in npz.files})
+    if mmap:
+        return ColumnarPages(_mmap_npz(source))
+    with np.load(source) as npz:
+        return ColumnarPages({name: npz[name] for name in npz.files})
+
+
+def load_pages(path):
+    """
+    按扩展名读取 OCR 结果：.npz 为内存映射的列式格式，其他按 JSON 解析
+    :return: pages_dict 或 ColumnarPages（两者都支持 data['pages']）
+    """
+    if path.endswith(COLUMNAR_EXT):
+        return load_columnar(path)
+    return load_json(path)
+
+
+def check_scores(data, columns):
+    """
+    检查列式结果的每页 score 与 JSON 逐值相同（按阈值划分只依赖 score，相同即划分结果一致）
+    :param data: JSON 解码得到的 pages_dict
+    :param columns: ColumnarPages
+    :raise ValueError: 页数或任一 score 不一致
+    """
+    expected = [[float(score) for score in page.get("score", []) if score is not None]
+                for page in data.get("pages", [])]
+    actual = columns.page_scores()
+    if len(expected) != len(actual):
+        raise ValueError(f"page count differs: {len(expected)} in JSON, {len(actual)} in columnar")
+    for page_idx, (json_scores, columnar_scores) in enumerate(zip(expected, actual)):
+        if json_scores != columnar_scores:
+            raise ValueError(f"scores differ on page {page_idx}: {json_scores} != {columnar_scores}")
+
+
+def json_to_columnar(json_path, npz_path):
+    """JSON -> 列式格式，写出后检查 score 与 JSON 一致"""
+    data = load_json(json_path)
+    save_columnar(data, npz_path)
+    check_scores(data, load_columnar(npz_path))
+
+
+def columnar_to_json(npz_path, json_path):
+    """列式格式 -> JSON"""
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(load_columnar(npz_path).to_pages_dict(), f, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert pages_dict JSON to/from the columnar .npz format.")
+    parser.add_argument("command", choices=["to-npz", "to-json", "check"],
+                        help="check: verify that a .json and its .npz carry identical scores")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args()
+    if args.command == "to-npz":
+        json_to_columnar(args.input, args.output)
+    elif args.command == "check":
+        check_scores(load_json(args.input), load_columnar(args.output))
+        print(f"{args.input} and {args.output} have identical scores.")
+    else:
+        columnar_to_json(args.input, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+标注 QA 用的低分辨率缩略图与拼图（contact sheet）：
+把多个文档的页面缩略图按网格拼接成一张图片，审核人员可以一次浏览大量页面，输出体积也很小。
+"""
+import os
+
+from PIL import Image, ImageDraw
+
+# 保存格式对应的 PIL 格式名和扩展名
+IMAGE_FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+}
+
+
+def pixmap_to_image(pix):
+    """将 alpha=False 的 RGB Pixmap 转换为 PIL Image"""
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def save_image(image, path_without_ext, image_format="webp", quality=75):
+    """
+    按指定格式保存图片
+    :return: 实际保存的文件路径
+    """
+    pil_format, ext = IMAGE_FORMATS[image_format]
+    path = path_without_ext + ext
+    image.save(path, format=pil_format, quality=quality)
+    return path
+
+
+class ContactSheetWriter:
+    """
+    将缩略图按 cols x rows 的网格拼接为 contact sheet，写满一张即保存，
+    并在 contact_index.tsv 中记录每个格子对应的 (样本key, 页码, 总页数)，用于回查和断点续跑。
+    索引随拼图一起写出，一个文档的页面可能分布在多张拼图中：中断时只写入了部分页面的文档不算完成，
+    续跑时重新加入该文档，已记录的页面会被跳过，不会重复写入拼图
+    """
+
+    INDEX_NAME = "contact_index.tsv"
+
+    def __init__(self, output_dir, cell_size=(240, 320), cols=8, rows=6, image_format="webp", quality=75):
+        """
+        :param output_dir: 输出文件夹
+        :param cell_size: 每个格子的 (宽, 高)，缩略图等比缩放后放入格子
+        :param cols: 每张拼图的列数
+        :param rows: 每张拼图的行数
+        :param image_format: 'webp' 或 'jpeg'
+        :param quality: 压缩质量
+        """
+        self.output_dir = output_dir
+        self.cell_width, self.cell_height = cell_size
+        self.cols = cols
+        self.rows = rows
+        self.image_format = image_format
+        self.quality = quality
+        self.index_path = os.path.join(output_dir, self.INDEX_NAME)
+
+        self.done_keys = set()
+        self.partial_pages = {}  # 只写入了部分页面的文档：key -> 已记录的页码集合
+        self.sheet_number = 0
+        if os.path.exists(self.index_path):
+            # 只有全部页面都已写入拼图的文档才视为完成；按不同页码计数，重复的索引行不计入
+            written_pages = {}
+            page_counts = {}
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    sheet, _, key, page_num, page_count = line.rstrip('\n').split('\t')
+                    written_pages.setdefault(key, set()).add(int(page_num))
+                    page_counts[key] = int(page_count)
+                    self.sheet_number = max(self.sheet_number, int(sheet) + 1)
+            for key, pages in written_pages.items():
+                if len(pages) >= page_counts[key]:
+                    self.done_keys.add(key)
+                else:
+                    self.partial_pages[key] = pages
+        self._sheet = None
+        self._entries = []
+
+    def _new_sheet(self):
+        self._sheet = Image.new("RGB", (self.cols * self.cell_width, self.rows * self.cell_height), "white")
+        self._draw = ImageDraw.Draw(self._sheet)
+        self._entries = []
+
+    def add_document(self, key, thumbnails):
+        """
+        加入一个文档的全部页面缩略图。拼图写满时立即保存，同一文档的页面可能落在相邻的两张拼图中；
+        上次中断前已记录在索引中的页面会被跳过
+        :param key: 样本 key
+        :param thumbnails: PIL Image 列表，按页码顺序
+        """
+        recorded = self.partial_pages.pop(key, set())
+        for page_num, thumbnail in enumerate(thumbnails):
+            if page_num + 1 in recorded:
+                continue
+            if self._sheet is None:
+                self._new_sheet()
+            cell = len(self._entries)
+            x = (cell % self.cols) * self.cell_width
+            y = (cell // self.cols) * self.cell_height
+            thumbnail.thumbnail((self.cell_width - 4, self.cell_height - 16))
+            self._sheet.paste(thumbnail, (x + 2, y + 14))
+            self._draw.text((x + 2, y + 1), f"{key} p{page_num + 1}", fill=(0, 0, 0))
+            self._entries.append((key, page_num + 1, len(thumbnails)))
+            if len(self._entries) == self.cols * self.rows:
+                self.flush()
+        self.done_keys.add(key)
+
+    def flush(self):
+        """保存当前拼图（可能未写满）并追加索引"""
+        if self._sheet is None or not self._entries:
+            return
+        save_image(self._sheet, os.path.join(self.output_dir, f"sheet_{self.sheet_number:05d}"),
+                   self.image_format, self.quality)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            for cell, (key, page_num, page_count) in enumerate(self._entries):
+                f.write(f"{self.sheet_number}\t{cell}\t{key}\t{page_num}\t{page_count}\n")
+        self.sheet_number += 1
+        self._sheet = None
+        self._entries = []
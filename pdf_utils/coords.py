@@ -0,0 +1,70 @@
+"""
+渲染像素坐标与 PDF 坐标之间的映射：
+检测模型输出的是渲染图（page.get_pixmap(matrix=...)）上的像素坐标，需要按渲染矩阵、页面旋转和
+cropbox 偏移换算回页面坐标。每页构造一个 PageTransform，整页的预测框一次性用 NumPy 换算。
+
+三种坐标：
+    visible 旋转后的可见页面坐标（左上角为原点，与 page.rect 一致），即渲染图除以缩放倍数
+    page    未旋转的页面坐标（相对 cropbox 左上角），即 visible * page.derotation_matrix
+    pdf     PDF 用户空间坐标（左下角为原点，相对 mediabox）
+"""
+import fitz  # PyMuPDF
+import numpy as np
+
+
+def transform_points(points, matrix):
+    """
+    对点数组做仿射变换
+    :param points: 形状为 (..., 2) 的数组
+    :param matrix: fitz.Matrix 或 6 元组
+    :return: 形状相同的 float64 数组
+    """
+    a, b, c, d, e, f = tuple(matrix)
+    points = np.asarray(points, dtype=np.float64)
+    x, y = points[..., 0], points[..., 1]
+    return np.stack((a * x + c * y + e, b * x + d * y + f), axis=-1)
+
+
+def transform_boxes(boxes, matrix):
+    """
+    对 [x0, y0, x1, y1] 框数组做仿射变换，旋转后取四个角点的外接矩形
+    :param boxes: 形状为 (N, 4) 的数组
+    :param matrix: fitz.Matrix 或 6 元组
+    :return: 形状为 (N, 4) 的 float64 数组
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    corners = np.stack((
+        boxes[:, [0, 1]], boxes[:, [2, 1]], boxes[:, [2, 3]], boxes[:, [0, 3]],
+    ), axis=1)
+    corners = transform_points(corners, matrix)
+    return np.concatenate((corners.min(axis=1), corners.max(axis=1)), axis=1)
+
+
+class PageTransform:
+    """
+    一页的坐标映射，由页面和渲染该页时使用的矩阵构造。只保存矩阵，不持有页面对象
+    """
+
+    def __init__(self, page, matrix=fitz.Identity):
+        """
+        :param page: PyMuPDF页面对象
+        :param matrix: 渲染该页时传给 get_pixmap 的矩阵
+        """
+        self.rotation = page.rotation
+        self.pixel_to_visible = ~fitz.Matrix(matrix)
+        self.visible_to_page = page.derotation_matrix
+        # cropbox 左上角在 PDF 用户空间中的位置（page.cropbox 为相对 mediabox 左上角、y 轴向下的坐标）
+        mediabox, cropbox = page.mediabox, page.cropbox
+        self.page_to_pdf = fitz.Matrix(1, 0, 0, -1, mediabox.x0 + cropbox.x0, mediabox.y1 - cropbox.y0)
+
+    def to_visible(self, boxes):
+        """像素框 -> 可见页面坐标框，用于在与可见页面同尺寸的未旋转页面（如合成的 PDF）上绘制"""
+        return transform_boxes(boxes, self.pixel_to_visible)
+
+    def to_page(self, boxes):
+        """像素框 -> 未旋转的页面坐标框"""
+        return transform_boxes(boxes, self.pixel_to_visible * self.visible_to_page)
+
+    def to_pdf(self, boxes):
+        """像素框 -> PDF 用户空间坐标框（[x0, y0, x1, y1]，y 轴向上）"""
+        return transform_boxes(boxes, self.pixel_to_visible * self.visible_to_page * self.page_to_pdf)
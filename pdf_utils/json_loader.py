@@ -0,0 +1,138 @@
+"""
+标注 JSON（pdfa-eng-wds / idl-wds 的 words/lines bbox、score、text 等）的统一读取入口：
+优先使用更快的解码器（orjson、pysimdjson），都不可用时回退到标准库 json。
+另外提供按字段的惰性读取，只解码调用方需要的字段（如 pages[*].score）。
+"""
+import io
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif simdjson is not None:
+    BACKEND = "simdjson"
+else:
+    BACKEND = "json"
+
+_TOKEN_RE = re.compile(r"([^.\[\]]+)|\[(\*|\d+)\]")
+
+
+def loads(data):
+    """
+    解析 JSON 文本
+    :param data: bytes 或 str
+    :return: 解析后的 Python 对象
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if simdjson is not None:
+        return simdjson.loads(data)
+    return json.loads(data)
+
+
+def load_json(json_path):
+    """
+    读取并解析 JSON 文件
+    :param json_path: JSON 文件路径
+    :return: 解析后的 Python 对象
+    """
+    with open(json_path, "rb") as file:
+        return loads(file.read())
+
+
+def parse_field_path(field):
+    """
+    解析字段路径，如 "pages[*].score" -> ['pages', '*', 'score']
+    :param field: 字段路径，'.' 分隔键，[*] 表示遍历数组，[n] 表示取第 n 个元素
+    :return: token 列表，数组下标为 int
+    """
+    tokens = []
+    for key, index in _TOKEN_RE.findall(field):
+        if key:
+            tokens.append(key)
+        elif index == "*":
+            tokens.append("*")
+        else:
+            tokens.append(int(index))
+    return tokens
+
+
+def _select(node, tokens, to_python):
+    """
+    在已解析（或惰性解析）的文档中按 token 取值，[*] 展开的结果按文档顺序放入列表
+    """
+    if not tokens:
+        return [to_python(node)]
+    token, rest = tokens[0], tokens[1:]
+    if token == "*":
+        matches = []
+        for item in node:
+            matches.extend(_select(item, rest, to_python))
+        return matches
+    return _select(node[token], rest, to_python)
+
+
+def _simdjson_to_python(node):
+    if isinstance(node, simdjson.Object):
+        return node.as_dict()
+    if isinstance(node, simdjson.Array):
+        return node.as_list()
+    return node
+
+
+def _ijson_prefix(tokens):
+    return ".".join("item" if token == "*" else str(token) for token in tokens)
+
+
+def load_fields(source, fields):
+    """
+    惰性读取：只解码指定字段，不为整个文档构建 Python 对象
+    :param source: JSON 文件路径或 bytes
+    :param fields: 字段路径列表，如 ['pages[*].score']
+    :return: {字段路径: 值}；路径中含 [*] 时值为按文档顺序排列的匹配列表
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    else:
+        with open(source, "rb") as file:
+            data = file.read()
+
+    parsed_fields = {field: parse_field_path(field) for field in fields}
+    result = {}
+    if simdjson is not None:
+        # pysimdjson 的 Parser 返回惰性对象，只有访问到的节点才会转换为 Python 对象
+        document = simdjson.Parser().parse(data)
+        for field, tokens in parsed_fields.items():
+            matches = _select(document, tokens, _simdjson_to_python)
+            result[field] = matches if "*" in tokens else matches[0]
+        return result
+
+    if BACKEND == "json" and ijson is not None and \
+            all(isinstance(token, str) for tokens in parsed_fields.values() for token in tokens):
+        # 只有标准库 json 可用时才用 ijson 流式解析（只为匹配前缀的节点构建对象）；
+        # 有 orjson 时整体解码比 ijson 流式解析快得多
+        for field, tokens in parsed_fields.items():
+            matches = list(ijson.items(io.BytesIO(data), _ijson_prefix(tokens), use_float=True))
+            result[field] = matches if "*" in tokens else matches[0]
+        return result
+
+    document = loads(data)
+    for field, tokens in parsed_fields.items():
+        matches = _select(document, tokens, lambda node: node)
+        result[field] = matches if "*" in tokens else matches[0]
+    return result
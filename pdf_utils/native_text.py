@@ -0,0 +1,86 @@
+"""
+原生文本层提取：
+对带有可靠文本层的 PDF（Word/PPT 导出等）直接用 page.get_text 读取文本行和精确位置，
+输出与 PaddleOCR 逐页结果相同的格式（[[poly, (text, score)], ...]，poly 为渲染图上的像素坐标），
+只有扫描页、纯图片页或页面中的图片区域才需要交给 OCR。
+"""
+import fitz  # PyMuPDF
+
+from pdf_utils.coords import transform_points
+
+# 每页至少有这么多可见字符时才认为文本层可用
+MIN_NATIVE_CHARS = 20
+# 无法映射到 Unicode 的字符（U+FFFD、私用区）超过该比例时认为文本层不可靠
+MAX_BAD_CHAR_RATIO = 0.05
+# 图片覆盖页面的比例不低于该值时按扫描页处理，整页 OCR
+SCAN_IMAGE_COVERAGE = 0.85
+# 面积不小于页面该比例的嵌入图片，作为区域单独 OCR
+MIN_REGION_AREA = 0.02
+
+
+def _is_bad_char(ch):
+    code = ord(ch)
+    return ch == "�" or 0xE000 <= code <= 0xF8FF
+
+
+def native_lines(page, matrix=fitz.Identity):
+    """
+    读取页面文本层的所有文本行
+    :param page: PyMuPDF页面对象
+    :param matrix: 渲染矩阵，poly 换算到该矩阵渲染的图片上
+    :return: ([[poly, (text, 1.0)], ...], 不可映射字符的比例)
+    """
+    # 文本坐标是未旋转的页面坐标，先换算到可见页面，再乘以渲染矩阵
+    to_pixel = page.rotation_matrix * fitz.Matrix(matrix)
+    lines = []
+    total = bad = 0
+    for block in page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE)["blocks"]:
+        if block.get("type") != 0:
+            continue
+        for line in block["lines"]:
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if not text:
+                continue
+            total += len(text)
+            bad += sum(1 for ch in text if _is_bad_char(ch))
+            x0, y0, x1, y1 = line["bbox"]
+            # 四个顶点顺序与 PaddleOCR 一致：左上、右上、右下、左下
+            poly = transform_points([(x0, y0), (x1, y0), (x1, y1), (x0, y1)], to_pixel)
+            lines.append([poly.tolist(), (text, 1.0)])
+    return lines, (bad / total if total else 0.0)
+
+
+def image_coverage(page):
+    """页面被嵌入图片覆盖的比例（按图片外接框面积之和计算，最大为 1）"""
+    area = page.rect.get_area() or 1.0
+    covered = 0.0
+    for info in page.get_image_info():
+        covered += (fitz.Rect(info["bbox"]) * page.rotation_matrix & page.rect).get_area()
+    return min(covered / area, 1.0)
+
+
+def image_regions(page, matrix=fitz.Identity, min_area=MIN_REGION_AREA):
+    """
+    页面中面积足够大的嵌入图片区域
+    :return: 渲染图上的像素矩形列表 [(x0, y0, x1, y1), ...]（整数，已裁剪到页面范围）
+    """
+    page_area = page.rect.get_area() or 1.0
+    to_pixel = page.rotation_matrix * fitz.Matrix(matrix)
+    bounds = page.rect * fitz.Matrix(matrix)
+    regions = []
+    for info in page.get_image_info():
+        rect = fitz.Rect(info["bbox"]) * page.rotation_matrix & page.rect
+        if rect.is_empty or rect.get_area() < min_area * page_area:
+            continue
+        pixel = (fitz.Rect(info["bbox"]) * to_pixel & bounds).irect
+        if not pixel.is_empty:
+            regions.append(tuple(pixel))
+    return regions
+
+
+def text_layer_is_reliable(lines, bad_ratio, coverage):
+    """
+    判断文本层是否可以代替 OCR：有足够的可见字符、几乎没有乱码，且页面不是整页扫描图
+    """
+    chars = sum(len(text) for _, (text, _) in lines)
+    return chars >= MIN_NATIVE_CHARS and bad_ratio <= MAX_BAD_CHAR_RATIO and coverage < SCAN_IMAGE_COVERAGE
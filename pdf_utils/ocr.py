@@ -0,0 +1,200 @@
+"""
+PaddleOCR 的批量调用封装：
+模型只加载一次；页面逐页做文本检测，检测到的文本框裁剪后跨页面、跨文档合并成一批做方向分类和识别，
+结果格式与 PaddleOCR.ocr() 的逐页输出一致（[[poly, (text, score)], ...]）。
+
+HybridOCR 在此基础上优先使用 PDF 原生文本层（见 pdf_utils.native_text），
+只对扫描页、纯图片页和页面中的图片区域做 OCR。
+"""
+import copy
+
+import fitz  # PyMuPDF
+import numpy as np
+from paddleocr import PaddleOCR
+from paddleocr.tools.infer.predict_system import sorted_boxes
+from paddleocr.tools.infer.utility import get_rotate_crop_image
+
+from pdf_utils.native_text import image_coverage, image_regions, native_lines, text_layer_is_reliable
+from pdf_utils.render_cache import default_cache
+
+
+def page_render_matrix(page):
+    """
+    与 PaddleOCR 读取 PDF 时相同的渲染规则：默认 2 倍，超过 2000 像素时退回 1 倍，
+    这样 poly 坐标与直接把 PDF 交给 PaddleOCR 时一致
+    """
+    mat = fitz.Matrix(2, 2)
+    rect = page.rect * mat
+    if rect.width > 2000 or rect.height > 2000:
+        mat = fitz.Matrix(1, 1)
+    return mat
+
+
+def render_page(page):
+    """
+    渲染一页为 BGR ndarray，渲染结果经过全局渲染缓存
+    :return: (BGR ndarray, 渲染矩阵)
+    """
+    mat = page_render_matrix(page)
+    rgb = default_cache().get_pixmap_array(page, mat)
+    return np.ascontiguousarray(rgb[:, :, ::-1]), mat
+
+
+def lines_to_page_dict(lines):
+    """
+    将一页的识别结果转换为 pages_dict 中的一页
+    :param lines: [[poly, (text, score)], ...]，没有识别结果时为 None 或空列表
+    :return: {'text': [...], 'poly': [...], 'score': [...]}
+    """
+    page_dict = {'text': [], 'poly': [], 'score': []}
+    for poly, (text, score) in lines or []:
+        page_dict['text'].append(text)
+        page_dict['poly'].append(poly)
+        page_dict['score'].append(float(score))
+    return page_dict
+
+
+class BatchOCR:
+    """
+    常驻内存的 PaddleOCR 模型，按批处理多页图片
+    """
+
+    def __init__(self, use_angle_cls=True, rec_batch_num=64, **ocr_kwargs):
+        """
+        :param use_angle_cls: 是否使用方向分类器
+        :param rec_batch_num: 识别模型每次前向的文本框数量
+        :param ocr_kwargs: 透传给 PaddleOCR 的其他参数（如 lang、use_gpu）
+        """
+        self.use_angle_cls = use_angle_cls
+        self.ocr = PaddleOCR(use_angle_cls=use_angle_cls, rec_batch_num=rec_batch_num, **ocr_kwargs)
+
+    def detect(self, image):
+        """
+        检测一页图片中的文本框
+        :return: 按从上到下、从左到右排序的文本框列表，每个为 (4, 2) ndarray
+        """
+        dt_boxes, _ = self.ocr.text_detector(image)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            return []
+        return sorted_boxes(dt_boxes)
+
+    def recognize(self, crops):
+        """
+        对一批文本框裁剪图做方向分类和识别
+        :param crops: BGR ndarray 列表
+        :return: [(text, score), ...]
+        """
+        if not crops:
+            return []
+        if self.use_angle_cls:
+            crops, _, _ = self.ocr.text_classifier(crops)
+        rec_res, _ = self.ocr.text_recognizer(crops)
+        return rec_res
+
+    def ocr_pages(self, images):
+        """
+        对一批页面图片做检测和识别，所有页面的文本框合并为一批识别
+        :param images: BGR ndarray 列表
+        :return: 每页的 [[poly, (text, score)], ...]，没有文本的页面为 None
+        """
+        page_boxes = [self.detect(image) for image in images]
+        crops = [
+            get_rotate_crop_image(image, copy.deepcopy(box))
+            for image, boxes in zip(images, page_boxes)
+            for box in boxes
+        ]
+        rec_res = self.recognize(crops)
+
+        results = []
+        offset = 0
+        for boxes in page_boxes:
+            lines = []
+            for box, (text, score) in zip(boxes, rec_res[offset:offset + len(boxes)]):
+                if score >= self.ocr.drop_score:
+                    lines.append([box.tolist(), (text, score)])
+            offset += len(boxes)
+            results.append(lines or None)
+        return results
+
+
+class PagePlan:
+    """
+    一页的混合识别计划：
+    - lines 为 None：文本层不可用，对整页图片 image 做 OCR
+    - lines 不为 None：使用原生文本行，另对 regions 中的图片区域（像素矩形）做 OCR
+    image 只在需要 OCR 或需要可视化时渲染，否则为 None
+    """
+
+    __slots__ = ("image", "lines", "regions")
+
+    def __init__(self, image, lines=None, regions=()):
+        self.image = image
+        self.lines = lines
+        self.regions = regions
+
+
+def plan_page(page, render_always=False):
+    """
+    读取页面文本层并决定哪些内容需要 OCR（可在渲染进程中调用）
+    :param page: PyMuPDF页面对象
+    :param render_always: 即使不需要 OCR 也渲染页面（用于可视化）
+    :return: PagePlan
+    """
+    mat = page_render_matrix(page)
+    lines, bad_ratio = native_lines(page, mat)
+    if not text_layer_is_reliable(lines, bad_ratio, image_coverage(page)):
+        return PagePlan(render_page(page)[0])
+    regions = image_regions(page, mat)
+    image = render_page(page)[0] if regions or render_always else None
+    return PagePlan(image, lines, regions)
+
+
+class HybridOCR:
+    """
+    按 PagePlan 处理一批页面：整页 OCR 的页面和各页的图片区域合并为一批交给 OCR 引擎，
+    区域的识别结果平移回整页坐标后与原生文本行合并
+    """
+
+    def __init__(self, engine):
+        """
+        :param engine: 提供 ocr_pages(images) 的 OCR 引擎（如 BatchOCR）
+        """
+        self.engine = engine
+
+    def ocr_pages(self, plans):
+        """
+        :param plans: PagePlan 列表
+        :return: 每页的 [[poly, (text, score)], ...]，没有文本的页面为 None
+        """
+        images, owners = [], []  # owners: (页序号, 区域左上角偏移；整页为 None)
+        for i, plan in enumerate(plans):
+            if plan.lines is None:
+                images.append(plan.image)
+                owners.append((i, None))
+                continue
+            for x0, y0, x1, y1 in plan.regions:
+                images.append(np.ascontiguousarray(plan.image[y0:y1, x0:x1]))
+                owners.append((i, (x0, y0)))
+
+        results = [list(plan.lines) if plan.lines is not None else [] for plan in plans]
+        ocr_results = self.engine.ocr_pages(images) if images else []
+        for (i, offset), lines in zip(owners, ocr_results):
+            if not lines:
+                continue
+            if offset is None:
+                results[i] = lines
+                continue
+            native_boxes = [_poly_bounds(poly) for poly, _ in plans[i].lines]
+            for poly, rec in lines:
+                poly = [[x + offset[0], y + offset[1]] for x, y in poly]
+                # 图片上叠加的原生文字已在文本层中，丢弃中心落在原生文本行内的区域识别结果
+                cx, cy = np.mean(poly, axis=0)
+                if not any(bx0 <= cx <= bx1 and by0 <= cy <= by1 for bx0, by0, bx1, by1 in native_boxes):
+                    results[i].append([poly, rec])
+        return [lines or None for lines in results]
+
+
+def _poly_bounds(poly):
+    xs = [point[0] for point in poly]
+    ys = [point[1] for point in poly]
+    return min(xs), min(ys), max(xs), max(ys)
@@ -0,0 +1,91 @@
+"""
+嵌入图片预提取：直接从 PDF 结构中读取每页嵌入图片的 xref、原始字节和位置，不需要渲染整页。
+没有嵌入图片的页面可以直接跳过后续的大模型分析，有图片时只把图片本身交给模型。
+"""
+from io import BytesIO
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from pdf_utils.coords import transform_boxes
+
+
+class ImageExtractor:
+    """
+    逐页提取嵌入图片；同一文档中重复引用的图片（相同 xref）只记录一次元数据。
+    只缓存尺寸和格式，不缓存原始字节：扫描件每页一张不同的大图，缓存字节会让内存随整个文档的图片总大小增长
+    """
+
+    def __init__(self, doc, min_size=16):
+        """
+        :param doc: 已打开的 PyMuPDF 文档
+        :param min_size: 图片原始宽或高小于该像素数时忽略（装饰线、占位点等）
+        """
+        self.doc = doc
+        self.min_size = min_size
+        self._meta = {}  # xref -> (width, height, ext)，无法读取时为 None
+
+    def extract(self, xref):
+        """
+        读取图片原始数据（不缓存），同时记录图片元数据
+        :return: extract_image 的结果字典（image/ext/width/height 等），失败时为 None
+        """
+        try:
+            info = self.doc.extract_image(xref) or None
+        except Exception:
+            info = None
+        self._meta[xref] = (info["width"], info["height"], info["ext"]) if info else None
+        return info
+
+    def page_images(self, page):
+        """
+        获取一页中每个图片的放置位置
+        :param page: PyMuPDF页面对象
+        :return: [{"xref", "bbox", "width", "height", "ext", "image"}, ...]，
+                 bbox 为可见页面坐标 [x0, y0, x1, y1]，同一图片放置多次时每次一项；
+                 image 为本页读取的原始字节，不在提取器中保留
+        """
+        results = []
+        # 同一图片在页面中放置多次时 get_images 会重复列出，get_image_rects 已返回全部位置
+        for xref in dict.fromkeys(item[0] for item in page.get_images(full=True)):
+            # 首次出现时读取一次，元数据和原始字节都用这次的结果；之后按缓存的元数据过滤
+            info = self.extract(xref) if xref not in self._meta else None
+            meta = self._meta[xref]
+            if meta is None or min(meta[0], meta[1]) < self.min_size:
+                continue
+            rects = [rect for rect in page.get_image_rects(xref) if not rect.is_empty]
+            if not rects:
+                continue
+            if info is None:
+                info = self.extract(xref)
+                if info is None:
+                    continue
+            width, height, ext = meta
+            # get_image_rects 返回未旋转的页面坐标，换算为可见页面坐标后裁剪到页面范围内
+            boxes = transform_boxes([tuple(rect) for rect in rects], page.rotation_matrix)
+            for box in boxes.tolist():
+                bbox = fitz.Rect(box) & page.rect
+                if bbox.is_empty:
+                    continue
+                results.append({
+                    "xref": xref,
+                    "bbox": [round(v, 2) for v in bbox],
+                    "width": width,
+                    "height": height,
+                    "ext": ext,
+                    "image": info["image"],
+                })
+        return results
+
+    def to_pil(self, xref):
+        """
+        将图片解码为 RGB 的 PIL Image；PIL 无法解码的格式（如 jbig2、jpx）交给 PyMuPDF 转换
+        """
+        info = self.extract(xref)
+        try:
+            return Image.open(BytesIO(info["image"])).convert("RGB")
+        except Exception:
+            pix = fitz.Pixmap(self.doc, xref)
+            if pix.colorspace is None or pix.colorspace.n != 3 or pix.alpha:
+                pix = fitz.Pixmap(fitz.csRGB, pix, 0)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
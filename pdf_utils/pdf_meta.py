@@ -0,0 +1,92 @@
+"""
+文档元数据：用 PyMuPDF 一次读取每页的 mediabox、cropbox 和旋转角度，结果按文件缓存。
+后续流程（合成 PDF 的页面尺寸、像素坐标换算等）直接使用缓存，不必再次解析 PDF。
+"""
+import os
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+
+# 元数据缓存：(路径, 大小, 修改时间) -> DocumentMeta，最多保留 MAX_CACHED 个文档
+MAX_CACHED = 256
+_meta_cache = OrderedDict()
+
+
+class PageMeta:
+    """
+    单页元数据，属性名与 fitz.Page 一致，可代替页面对象传给 PageTransform
+    """
+
+    __slots__ = ("number", "rect", "mediabox", "cropbox", "rotation", "derotation_matrix")
+
+    def __init__(self, page):
+        self.number = page.number
+        self.rect = page.rect  # 可见页面（cropbox 旋转后）的尺寸
+        self.mediabox = page.mediabox
+        self.cropbox = page.cropbox
+        self.rotation = page.rotation
+        self.derotation_matrix = page.derotation_matrix
+
+    @property
+    def width(self):
+        return self.rect.width
+
+    @property
+    def height(self):
+        return self.rect.height
+
+    @property
+    def size(self):
+        """可见页面尺寸 (width, height)，与渲染图像的宽高比一致"""
+        return self.rect.width, self.rect.height
+
+
+class DocumentMeta:
+    """
+    整个文档的逐页元数据
+    """
+
+    def __init__(self, pages, name=None):
+        self.pages = pages
+        self.name = name
+
+    @classmethod
+    def from_document(cls, doc):
+        """从已打开的文档读取元数据"""
+        return cls([PageMeta(page) for page in doc], doc.name)
+
+    def page_size(self, page_num):
+        """
+        获取页面尺寸，页码超出范围时使用最后一页的尺寸
+        :return: (width, height)
+        """
+        return self.pages[min(page_num, len(self.pages) - 1)].size
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, page_num):
+        return self.pages[page_num]
+
+    def __iter__(self):
+        return iter(self.pages)
+
+
+def get_document_meta(pdf_path):
+    """
+    获取 PDF 的逐页元数据，同一文件未修改时只解析一次
+    :param pdf_path: PDF 文件路径
+    :return: DocumentMeta
+    """
+    stat = os.stat(pdf_path)
+    memo_key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+    meta = _meta_cache.get(memo_key)
+    if meta is not None:
+        _meta_cache.move_to_end(memo_key)
+        return meta
+    with fitz.open(pdf_path) as doc:
+        meta = DocumentMeta.from_document(doc)
+    _meta_cache[memo_key] = meta
+    if len(_meta_cache) > MAX_CACHED:
+        _meta_cache.popitem(last=False)
+    return meta
@@ -0,0 +1,145 @@
+"""
+渲染、推理、写出三段流水线：
+多个渲染进程把页面图片放入有界队列，推理阶段（主进程，模型常驻）按批消费，
+写出线程异步保存 JSON 和图片。队列有界，渲染快于推理时会被阻塞（背压），
+因此处理上千页的文档时内存占用保持平稳。
+
+PyMuPDF 不支持多线程并发使用，所以渲染阶段使用进程而不是线程。
+"""
+import multiprocessing as mp
+import queue
+import threading
+import traceback
+
+import fitz  # PyMuPDF
+
+# 渲染进程结束标记
+_DONE = "__done__"
+
+
+def _render_worker(render_fn, task_queue, page_queue):
+    """
+    渲染进程：从任务队列取 (文档序号, PDF路径, 页码)，渲染后放入有界页面队列
+    """
+    doc_path, doc = None, None
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            doc_idx, pdf_path, page_idx = task
+            if pdf_path != doc_path:
+                if doc is not None:
+                    doc.close()
+                doc_path, doc = pdf_path, fitz.open(pdf_path)
+            image = render_fn(doc[page_idx])
+            page_queue.put((doc_idx, page_idx, image))
+    except Exception:
+        page_queue.put((_DONE, traceback.format_exc(), None))
+        return
+    finally:
+        if doc is not None:
+            doc.close()
+    page_queue.put((_DONE, None, None))
+
+
+class _DocumentWriter(threading.Thread):
+    """
+    写出线程：逐页调用 writer.write_page，文档的所有页面写完后调用 writer.finish_document
+    """
+
+    def __init__(self, writer, pdf_paths, page_counts, queue_size):
+        super().__init__(daemon=True)
+        self.writer = writer
+        self.pdf_paths = pdf_paths
+        self.page_counts = page_counts
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+
+    def run(self):
+        results = {}
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue  # 出错后继续取出队列中的数据，避免推理阶段阻塞
+            doc_idx, page_idx, image, result = item
+            try:
+                pdf_path = self.pdf_paths[doc_idx]
+                self.writer.write_page(pdf_path, page_idx, image, result)
+                doc_results = results.setdefault(doc_idx, {})
+                doc_results[page_idx] = result
+                if len(doc_results) == self.page_counts[doc_idx]:
+                    del results[doc_idx]
+                    self.writer.finish_document(pdf_path, [doc_results[i] for i in range(self.page_counts[doc_idx])])
+            except Exception:
+                self.error = traceback.format_exc()
+
+
+def run_pipeline(pdf_paths, render_fn, infer_fn, writer, render_workers=2, queue_size=8, batch_size=1, page_num=0):
+    """
+    以流水线方式处理多个 PDF
+    :param pdf_paths: PDF 文件路径列表
+    :param render_fn: 渲染函数 page -> 图片（需为模块级函数，以便传给渲染进程）
+    :param infer_fn: 推理函数 图片列表 -> 结果列表，在当前进程中调用，模型只需加载一次
+    :param writer: 提供 write_page(pdf_path, page_idx, image, result) 和
+                   finish_document(pdf_path, page_results) 的对象，在写出线程中调用
+    :param render_workers: 渲染进程数
+    :param queue_size: 页面队列和写出队列的容量（页数）
+    :param batch_size: 每次推理的页数
+    :param page_num: 每个文档处理的页数，0 表示全部
+    """
+    page_counts = []
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as doc:
+            page_counts.append(doc.page_count if page_num == 0 else min(page_num, doc.page_count))
+
+    task_queue = mp.Queue()
+    page_queue = mp.Queue(maxsize=queue_size)
+    for doc_idx, pdf_path in enumerate(pdf_paths):
+        for page_idx in range(page_counts[doc_idx]):
+            task_queue.put((doc_idx, pdf_path, page_idx))
+    for _ in range(render_workers):
+        task_queue.put(None)
+
+    workers = [
+        mp.Process(target=_render_worker, args=(render_fn, task_queue, page_queue), daemon=True)
+        for _ in range(render_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    writer_thread = _DocumentWriter(writer, pdf_paths, page_counts, queue_size)
+    writer_thread.start()
+
+    def infer(batch):
+        results = infer_fn([image for _, _, image in batch])
+        for (doc_idx, page_idx, image), result in zip(batch, results):
+            writer_thread.queue.put((doc_idx, page_idx, image, result))
+
+    try:
+        batch = []
+        running = render_workers
+        while running:
+            doc_idx, page_idx, image = page_queue.get()
+            if doc_idx == _DONE:
+                running -= 1
+                if page_idx is not None:
+                    raise RuntimeError(f"Render worker failed:\n{page_idx}")
+                continue
+            batch.append((doc_idx, page_idx, image))
+            if len(batch) >= batch_size:
+                infer(batch)
+                batch = []
+        if batch:
+            infer(batch)
+    finally:
+        writer_thread.queue.put(None)
+        writer_thread.join()
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    if writer_thread.error is not None:
+        raise RuntimeError(f"Writer failed:\n{writer_thread.error}")
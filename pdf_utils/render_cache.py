@@ -0,0 +1,139 @@
+"""
+页面渲染缓存：
+以 (PDF 内容哈希, 页码, 渲染矩阵, 颜色空间, alpha) 为键缓存 page.get_pixmap 的结果，
+内存中为 LRU，可选落盘（.npy，读取时内存映射）。同一语料上重复实验时不再重复渲染页面。
+
+返回的 ndarray 是 pix.samples 缓冲区的只读视图（形状为 (高, 宽, 通道数)），多次获取不会复制数据；
+需要修改或需要 BGR 连续数组时由调用方自行复制。
+
+default_cache() 返回的全局缓存供只渲染一遍的流水线使用（OCR、表格检测的渲染进程等），默认不保留内存中的页面，
+内存占用不随页数增长：设置环境变量 PDF_RENDER_CACHE_DIR 后使用磁盘缓存，
+设置 PDF_RENDER_CACHE_MB 后同时启用该大小的内存 LRU。需要在同一进程中反复读取页面的调用方自行创建 RenderCache。
+"""
+import hashlib
+import os
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+import numpy as np
+
+# 文件哈希缓存：(路径, 大小, 修改时间) -> sha1
+_file_hashes = {}
+
+
+def file_hash(path):
+    """计算文件内容的 sha1，同一文件未修改时只计算一次"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_hashes.get(memo_key)
+    if digest is None:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        digest = _file_hashes[memo_key] = sha1.hexdigest()
+    return digest
+
+
+def document_hash(doc):
+    """
+    文档内容哈希：从文件打开的文档使用文件哈希，从内存打开的文档对其序列化结果求哈希
+    """
+    if doc.name and os.path.isfile(doc.name):
+        return file_hash(doc.name)
+    return hashlib.sha1(doc.tobytes()).hexdigest()
+
+
+class RenderCache:
+    """
+    内存 LRU + 可选磁盘缓存的页面渲染缓存
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=512 * 1024 * 1024):
+        """
+        :param cache_dir: 磁盘缓存文件夹，None 表示只使用内存缓存
+        :param max_bytes: 内存缓存的最大字节数，0 表示不使用内存缓存
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _doc_hash(self, doc):
+        if doc.name and os.path.isfile(doc.name):
+            return file_hash(doc.name)
+        # 从内存打开的文档只计算一次哈希，记录在文档对象上
+        digest = getattr(doc, "_render_cache_hash", None)
+        if digest is None:
+            digest = document_hash(doc)
+            doc._render_cache_hash = digest
+        return digest
+
+    def _disk_path(self, key):
+        digest, page_number, matrix, colorspace, alpha = key
+        matrix_str = "_".join(f"{v:g}" for v in matrix)
+        name = f"{digest}_p{page_number}_m{matrix_str}_{colorspace}_{int(alpha)}.npy"
+        return os.path.join(self.cache_dir, digest[:2], name)
+
+    def _remember(self, key, array):
+        if self.max_bytes <= 0:
+            return
+        self._entries[key] = array
+        self._entries.move_to_end(key)
+        self._bytes += array.nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def get_pixmap_array(self, page, matrix=fitz.Identity, colorspace=fitz.csRGB, alpha=False):
+        """
+        获取页面渲染结果
+        :param page: PyMuPDF页面对象
+        :param matrix: 渲染矩阵
+        :param colorspace: 颜色空间
+        :param alpha: 是否包含 alpha 通道
+        :return: 只读 uint8 ndarray，形状为 (高, 宽, 通道数)
+        """
+        key = (self._doc_hash(page.parent), page.number, tuple(fitz.Matrix(matrix)), colorspace.name, bool(alpha))
+        array = self._entries.get(key)
+        if array is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return array
+
+        disk_path = self._disk_path(key) if self.cache_dir else None
+        if disk_path and os.path.exists(disk_path):
+            array = np.load(disk_path, mmap_mode='r')
+            self.hits += 1
+        else:
+            pix = page.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=alpha)
+            array = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+            self.misses += 1
+            if disk_path:
+                os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+                tmp_path = disk_path + f".{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, array)
+                os.replace(tmp_path, disk_path)
+        self._remember(key, array)
+        return array
+
+
+_default_cache = None
+
+
+def default_cache():
+    """
+    进程内共享的全局缓存：磁盘缓存文件夹由环境变量 PDF_RENDER_CACHE_DIR 指定，
+    内存缓存大小由 PDF_RENDER_CACHE_MB 指定（默认 0，不保留渲染过的页面）
+    """
+    global _default_cache
+    if _default_cache is None:
+        max_mb = float(os.environ.get("PDF_RENDER_CACHE_MB") or 0)
+        _default_cache = RenderCache(cache_dir=os.environ.get("PDF_RENDER_CACHE_DIR") or None,
+                                     max_bytes=int(max_mb * 1024 * 1024))
+    return _default_cache
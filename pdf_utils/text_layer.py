@@ -0,0 +1,142 @@
+"""
+基于 ReportLab 的纯文本层 PDF 合成：
+每页只生成一个文本对象（字体、颜色只设置一次），字形宽度按 (字体, 字号) 缓存，
+整个 shard 逐个文档生成并立即落盘，内存占用只与单个文档有关。
+"""
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+from pdf_utils.trace import span
+
+
+class GlyphWidthCache:
+    """
+    按 (字体, 字号) 缓存单个字符的宽度，字符串宽度为字符宽度之和
+    （ReportLab 不做字距调整，结果与 stringWidth 一致）
+    """
+
+    def __init__(self):
+        self._tables = {}
+
+    def string_width(self, text, font_name, font_size):
+        """
+        计算字符串宽度
+        :param text: 文本
+        :param font_name: 已注册的字体名称
+        :param font_size: 字体大小
+        :return: 宽度（pt）
+        """
+        table = self._tables.get((font_name, font_size))
+        if table is None:
+            table = self._tables[(font_name, font_size)] = {}
+        font = None
+        width = 0.0
+        for ch in text:
+            w = table.get(ch)
+            if w is None:
+                if font is None:
+                    font = pdfmetrics.getFont(font_name)
+                w = table[ch] = font.stringWidth(ch, font_size)
+            width += w
+        return width
+
+
+# 进程内共享的字形宽度缓存，同一 shard 的多个文档复用
+_default_widths = GlyphWidthCache()
+
+
+def layout_lines(texts, polys, width, height, font_name, font_size, align="left",
+                 line_spacing=18, widths=None):
+    """
+    计算一页中每行文本的绘制起点
+    :param texts: 文本列表
+    :param polys: 与文本对应的多边形，点坐标为 {"X":, "Y":} 的页面比例
+    :param width: 页面宽度
+    :param height: 页面高度
+    :param align: 对齐方式 ("left", "center", "right")
+    :param line_spacing: 行间距（pt）
+    :param widths: GlyphWidthCache，默认使用进程内共享缓存
+    :return: [(x, y, text), ...]，坐标为 ReportLab 坐标（左下角为原点）
+    """
+    widths = widths or _default_widths
+    placed = []
+    current_y = None  # 用于跟踪当前行的 y 坐标
+    for text, poly_points in zip(texts, polys):
+        x_coords = [point["X"] * width for point in poly_points]
+        min_x, max_x = min(x_coords), max(x_coords)
+        min_y = min(point["Y"] for point in poly_points) * height
+
+        # 第一行对齐到矩形框顶部，其余行按行间距依次下移
+        if current_y is None:
+            current_y = height - min_y
+        else:
+            current_y -= line_spacing
+
+        if align == "center":
+            text_x = min_x + (max_x - min_x - widths.string_width(text, font_name, font_size)) / 2
+        elif align == "right":
+            text_x = max_x - widths.string_width(text, font_name, font_size)
+        else:
+            text_x = min_x
+        placed.append((text_x, current_y, text))
+    return placed
+
+
+class TextLayerWriter:
+    """
+    纯文本层 PDF 写入器：add_page 逐页追加文本，每页对应一个文本对象，close 时写盘
+    """
+
+    def __init__(self, output_path, pagesize, font_name="Helvetica", font_size=12, font_color=(0, 0, 0)):
+        self.pagesize = pagesize
+        self.font_name = font_name
+        self.font_size = font_size
+        self.font_color = font_color
+        # ReportLab 对 TTF 字体只嵌入用到的字形子集；页面内容流压缩后写出
+        self._canvas = canvas.Canvas(output_path, pagesize=pagesize, pageCompression=1)
+
+    def add_page(self, lines, pagesize=None):
+        """
+        追加一页
+        :param lines: [(x, y, text), ...]
+        :param pagesize: 该页尺寸，默认沿用上一页
+        """
+        c = self._canvas
+        if pagesize is not None:
+            c.setPageSize(pagesize)
+        if lines:
+            text_obj = c.beginText()
+            text_obj.setFont(self.font_name, self.font_size)
+            text_obj.setFillColorRGB(*self.font_color)
+            for x, y, text in lines:
+                text_obj.setTextOrigin(x, y)
+                text_obj.textOut(text)
+            c.drawText(text_obj)
+        c.showPage()
+
+    def close(self):
+        with span("text_layer.save"):
+            self._canvas.save()
+        self._canvas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._canvas is not None:
+            self.close()
+
+
+def synthesize_shard(documents, synthesize_fn):
+    """
+    逐个文档合成 PDF 的生成器：一次只持有一个文档的数据，生成后立即写盘
+    :param documents: 可迭代的 (json_data, output_path, original_pdf_path)，建议传入惰性迭代器
+    :param synthesize_fn: 单文档合成函数，签名为 fn(json_data, output_path, original_pdf_path)
+    :return: 依次产出 (output_path, error)，成功时 error 为 None
+    """
+    for json_data, output_path, original_pdf_path in documents:
+        try:
+            synthesize_fn(json_data, output_path, original_pdf_path)
+            yield output_path, None
+        except Exception as e:
+            yield output_path, e
@@ -0,0 +1,283 @@
+"""
+分阶段计时与内存记录：
+用 span(name, **args) 上下文管理器或 @traced 装饰器包住各处理阶段，每个阶段结束时记录
+墙钟时间、CPU 时间和 RSS 变化，按文档、按页的 span 通过参数（pdf=、page=）区分。
+
+设置环境变量 PDF_TRACE 为输出文件后启用：
+- 以 .json 结尾时写 Chrome trace 事件（chrome://tracing 或 https://ui.perfetto.dev 打开，嵌套的 span 按时间自动叠放）
+- 其他扩展名写 JSONL，每行一个 span
+未启用时 span() 直接返回共享的空上下文管理器，可以常开。
+渲染进程等子进程继承同一个输出文件，每条记录一次 O_APPEND 写入，不会互相截断；
+Chrome trace 开头的 "[" 在 configure() 时由父进程写入，子进程只追加事件。
+
+用法示例：
+    PDF_TRACE=trace.jsonl python "create_pdf-text&table.py"
+    PDF_TRACE=trace.json python pdf_image_extract.py a.pdf --backend mock
+    python -m pdf_utils.trace trace.jsonl        # 按阶段汇总
+"""
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+TRACE_ENV = "PDF_TRACE"
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+_statm = {}  # pid -> /proc/self/statm 的文件描述符，每个进程只打开一次
+
+
+def _rss_bytes():
+    """当前进程的常驻内存（Linux 读取 /proc/self/statm，其他平台返回 None）"""
+    pid = os.getpid()
+    try:
+        fd = _statm.get(pid)
+        if fd is None:
+            fd = _statm[pid] = os.open("/proc/self/statm", os.O_RDONLY)
+        return int(os.pread(fd, 128, 0).split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError, AttributeError):
+        return None
+
+
+class _NullSpan:
+    """未启用时使用的空 span"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    一个计时区间：进入时记下墙钟时间、进程 CPU 时间和 RSS，退出时把差值交给 Tracer 写出
+    """
+
+    __slots__ = ("tracer", "name", "args", "parent", "ts", "start", "cpu_start", "rss_start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        """补充参数（如处理完才知道的页数、结果数）"""
+        self.args.update(args)
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.rss_start = _rss_bytes()
+        self.ts = time.time()
+        self.cpu_start = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu_start
+        rss = _rss_bytes()
+        stack = self.tracer.stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self, wall, cpu, rss)
+        return False
+
+
+class Tracer:
+    """
+    把结束的 span 写入文件
+    :param path: 输出文件路径
+    :param fmt: "chrome" 或 "jsonl"，None 时按扩展名判断（.json 为 chrome）
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.chrome = fmt == "chrome" if fmt else path.endswith(".json")
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.chrome:
+            self._write_header()
+
+    def _write_header(self):
+        """
+        在启动子进程之前写入 Chrome trace 的 "[" 。子进程各自按需写入时，同时写出第一条事件的
+        多个进程都会看到空文件，写出多个 "["，文件无法解析。spawn 的子进程导入时重新 configure，
+        此时文件已非空，不会重复写入
+        """
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if os.fstat(fd).st_size == 0:
+                # Chrome trace 的 JSON 数组格式允许省略结尾的 "]"，进程中途退出也能打开
+                os.write(fd, b"[\n")
+        finally:
+            os.close(fd)
+
+    def stack(self):
+        """当前线程中尚未结束的 span"""
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def record(self, span, wall, cpu, rss):
+        rss_mb = rss / 1048576 if rss is not None else None
+        rss_delta_mb = (rss - span.rss_start) / 1048576 if rss is not None and span.rss_start is not None else None
+        if self.chrome:
+            event = {
+                "name": span.name, "cat": "pdf", "ph": "X",
+                "ts": span.ts * 1e6, "dur": wall * 1e6,
+                "pid": os.getpid(), "tid": threading.get_ident(),
+                "args": dict(span.args, cpu_ms=cpu * 1000, rss_mb=rss_mb, rss_delta_mb=rss_delta_mb),
+            }
+        else:
+            event = {
+                "name": span.name, "parent": span.parent, "ts": span.ts,
+                "wall_ms": wall * 1000, "cpu_ms": cpu * 1000, "rss_mb": rss_mb, "rss_delta_mb": rss_delta_mb,
+                "pid": os.getpid(), "tid": threading.get_ident(), **span.args,
+            }
+        self.write(event)
+
+    def write(self, event):
+        line = json.dumps(event, ensure_ascii=False, default=str) + (",\n" if self.chrome else "\n")
+        with self._lock:
+            try:
+                # fork 出的子进程重新打开文件，不共享父进程的文件描述符状态
+                if self._fd is None or self._pid != os.getpid():
+                    self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                    self._pid = os.getpid()
+                os.write(self._fd, line.encode("utf-8"))
+            except OSError as e:
+                print(f"Trace disabled, failed to write {self.path}: {e}")
+                configure(None)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+_tracer = None
+
+
+def configure(path=None, fmt=None):
+    """
+    启用或关闭记录；Chrome 格式在这里写入文件开头，需在启动子进程之前调用
+    :param path: 输出文件路径，None 表示关闭
+    :param fmt: "chrome" 或 "jsonl"，None 时按扩展名判断
+    """
+    global _tracer
+    _tracer = None
+    if path:
+        try:
+            _tracer = Tracer(path, fmt)
+        except OSError as e:
+            print(f"Trace disabled, failed to open {path}: {e}")
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **args):
+    """
+    记录一个处理阶段
+    :param name: 阶段名称，如 "create_pdf"、"table.render"
+    :param args: 附加参数，如 pdf=路径、page=页码
+    :return: 上下文管理器，可调用 set(**args) 补充参数
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, args)
+
+
+def traced(name=None):
+    """
+    装饰器：每次调用函数记录一个 span，名称默认为函数名
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _reset_after_fork():
+    # fork 时其他线程可能持有写锁，子进程中换成新锁
+    if _tracer is not None:
+        _tracer._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+configure(os.environ.get(TRACE_ENV))
+
+
+def load_events(path):
+    """
+    读取输出文件，统一为 JSONL 格式的字典列表
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".json"):
+        events = json.loads(text.rstrip().rstrip(",").rstrip("]") + "]")
+        return [{"name": e["name"], "wall_ms": e["dur"] / 1000, **e.get("args", {})} for e in events]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def summarize(events):
+    """
+    按阶段名称汇总
+    :return: [(名称, 次数, 墙钟总时间 ms, CPU 总时间 ms, RSS 最大增量 MB), ...]，按墙钟总时间降序
+    """
+    totals = defaultdict(lambda: [0, 0.0, 0.0, None])
+    for event in events:
+        total = totals[event["name"]]
+        total[0] += 1
+        total[1] += event["wall_ms"]
+        total[2] += event.get("cpu_ms") or 0.0
+        delta = event.get("rss_delta_mb")
+        if delta is not None:
+            total[3] = delta if total[3] is None else max(total[3], delta)
+    return sorted(((name, *total) for name, total in totals.items()), key=lambda row: -row[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a PDF_TRACE output file by stage.")
+    parser.add_argument("trace", help="trace file written with PDF_TRACE (.jsonl or Chrome .json)")
+    args = parser.parse_args()
+
+    print(f"{'stage':<32} {'count':>7} {'wall ms':>11} {'cpu ms':>11} {'mean ms':>9} {'max ΔRSS MB':>12}")
+    for name, count, wall, cpu, rss_delta in summarize(load_events(args.trace)):
+        rss = f"{rss_delta:.1f}" if rss_delta is not None else "-"
+        print(f"{name:<32} {count:>7} {wall:>11.1f} {cpu:>11.1f} {wall / count:>9.2f} {rss:>12}")
+
+
+if __name__ == "__main__":
+    main()
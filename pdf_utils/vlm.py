@@ -0,0 +1,108 @@
+"""
+视觉语言模型（VLM）推理后端：
+- QwenVLBackend：Qwen2-VL，一次 generate 处理一批图片（左填充，逐样本截掉提示词后解码）
+- MockVLMBackend：不加载模型、只在 CPU 上返回固定响应，用于没有 GPU 时测试流程和吞吐
+
+后端统一提供 generate(images, prompt) -> [str, ...]，images 为 PIL Image 列表，输出与输入一一对应。
+transformers / torch 只在创建 QwenVLBackend 时导入。
+"""
+import json
+import time
+
+from pdf_utils.trace import span
+
+
+class QwenVLBackend:
+    """
+    Qwen2-VL 批量推理后端
+    """
+
+    def __init__(self, model_path, device="auto", max_new_tokens=1024, do_sample=True, temperature=0.7, top_p=0.9):
+        """
+        :param model_path: 本地模型路径
+        :param device: "auto"（多卡自动切分）、"cuda" 或 "cpu"；cpu 时使用 float32 和 sdpa 注意力
+        """
+        import torch
+        from transformers import Qwen2VLForConditionalGeneration, AutoProcessor
+
+        if device == "cpu":
+            model_kwargs = dict(torch_dtype=torch.float32, attn_implementation="sdpa")
+        else:
+            model_kwargs = dict(torch_dtype=torch.bfloat16, attn_implementation="flash_attention_2",
+                                device_map="auto" if device == "auto" else device)
+        self.model = Qwen2VLForConditionalGeneration.from_pretrained(model_path, **model_kwargs)
+        self.processor = AutoProcessor.from_pretrained(model_path)
+        # 批量生成时必须左填充，保证每个样本的新 token 从同一位置开始
+        self.processor.tokenizer.padding_side = "left"
+        self.generate_kwargs = dict(max_new_tokens=max_new_tokens, do_sample=do_sample,
+                                    temperature=temperature, top_p=top_p)
+
+    def generate(self, images, prompt):
+        from qwen_vl_utils import process_vision_info
+
+        # PIL 图片直接放入消息，不再经过 PNG 编码/解码
+        messages_batch = [
+            [{"role": "user", "content": [{"type": "image", "image": image}, {"type": "text", "text": prompt}]}]
+            for image in images
+        ]
+        with span("vlm.preprocess", images=len(images)):
+            texts = [
+                self.processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+                for messages in messages_batch
+            ]
+            image_inputs, video_inputs = process_vision_info(messages_batch)
+            inputs = self.processor(
+                text=texts,
+                images=image_inputs,
+                videos=video_inputs,
+                padding=True,
+                return_tensors="pt",
+            ).to(self.model.device)
+
+        with span("vlm.generate", images=len(images)) as generate_span:
+            generated_ids = self.model.generate(**inputs, **self.generate_kwargs)
+            # 左填充后所有样本的提示词长度相同，截掉后只解码新生成的部分
+            generated_ids = generated_ids[:, inputs.input_ids.shape[1]:]
+            generate_span.set(new_tokens=int(generated_ids.shape[1]))
+        with span("vlm.decode"):
+            return self.processor.batch_decode(
+                generated_ids,
+                skip_special_tokens=True,
+                clean_up_tokenization_spaces=False
+            )
+
+
+class MockVLMBackend:
+    """
+    CPU 模拟后端：按图片数量返回固定响应，可设置每张图片的模拟耗时
+    """
+
+    def __init__(self, response=None, seconds_per_image=0.0, **kwargs):
+        """
+        :param response: 每张图片返回的文本，默认为空的 images 数组
+        :param seconds_per_image: 每张图片的模拟推理耗时（秒）
+        """
+        self.response = response if response is not None else json.dumps({"images": []})
+        self.seconds_per_image = seconds_per_image
+
+    def generate(self, images, prompt):
+        if self.seconds_per_image:
+            time.sleep(self.seconds_per_image * len(images))
+        return [self.response for _ in images]
+
+
+BACKENDS = {
+    "qwen": QwenVLBackend,
+    "mock": MockVLMBackend,
+}
+
+
+def create_backend(name, **kwargs):
+    """
+    按名称创建推理后端
+    :param name: BACKENDS 中的名称
+    :param kwargs: 传给后端构造函数的参数
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown VLM backend '{name}', choose from {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
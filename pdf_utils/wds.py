@@ -0,0 +1,91 @@
+"""
+webdataset（pdfa-eng-wds / idl-wds）tar 分片的流式读写工具：
+直接按样本 key 读取 tar 中的成员，不需要先把分片解压到磁盘。
+"""
+import io
+import re
+import tarfile
+import time
+
+# 与 webdataset 相同的 key/扩展名拆分规则：key 取到文件名中第一个 '.' 之前
+_KEY_EXT_RE = re.compile(r"^((?:.*/|)[^./]+)\.([^/]*)$")
+
+
+def split_key_ext(member_name):
+    """
+    将 tar 成员名拆分为 (样本key, 扩展名)
+    :param member_name: tar 成员名，如 "idl-train-00002/fjny0110.json"
+    :return: (key, ext)，ext 带前导 '.'；无法拆分时返回 (None, None)
+    """
+    match = _KEY_EXT_RE.match(member_name)
+    if match is None:
+        return None, None
+    return match.group(1), "." + match.group(2)
+
+
+def iter_tar_samples(tar_path, extensions=None):
+    """
+    以流方式遍历 webdataset tar 分片，按样本 key 分组产出样本。
+    webdataset 中同一样本的成员在 tar 中是连续存放的，因此内存中最多只保留一个样本。
+    :param tar_path: tar 分片路径（支持 .tar/.tar.gz 等 tarfile 可识别的格式）
+    :param extensions: 需要读取的扩展名集合（如 {'.json', '.pdf'}），None 表示全部读取
+    :return: 生成器，产出 (key, {ext: bytes})
+    """
+    current_key = None
+    current_files = {}
+    with tarfile.open(tar_path, mode="r|*") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            key, ext = split_key_ext(member.name)
+            if key is None:
+                continue
+            if key != current_key:
+                if current_files:
+                    yield current_key, current_files
+                current_key = key
+                current_files = {}
+            if extensions is not None and ext not in extensions:
+                continue
+            current_files[ext] = tar.extractfile(member).read()
+    if current_files:
+        yield current_key, current_files
+
+
+class TarShardWriter:
+    """
+    将样本直接写入输出 tar 分片（webdataset 格式），不经过临时目录
+    """
+
+    def __init__(self, tar_path):
+        """
+        :param tar_path: 输出 tar 分片路径
+        """
+        self.tar_path = tar_path
+        self._tar = tarfile.open(tar_path, mode="w")
+        self.sample_count = 0
+
+    def write_sample(self, key, files):
+        """
+        写入一个样本的全部成员
+        :param key: 样本 key
+        :param files: {ext: bytes}
+        """
+        now = time.time()
+        for ext in sorted(files):
+            data = files[ext]
+            info = tarfile.TarInfo(name=key + ext)
+            info.size = len(data)
+            info.mtime = now
+            info.mode = 0o644
+            self._tar.addfile(info, io.BytesIO(data))
+        self.sample_count += 1
+
+    def close(self):
+        self._tar.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()